@@ -0,0 +1,55 @@
+"""
+Benchmarks Compiler._order_line_chains on evenly spread and on clustered chains. Ordering should take close to linear
+time in both cases, ie. the time per chain should grow slowly (logarithmically) with the number of chains.
+
+The clustered input is the worst case of uniform grids: a dense motif with a few distant strokes around it, like a
+drawing with a border or scattered dots.
+
+Usage: python benchmarks/order_chains.py [number of chains...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from svg_to_gcode.compiler import Compiler, interfaces
+from svg_to_gcode.geometry import LineSegmentChain
+
+
+def generate_chains(count, clustered, seed=0):
+    """Short strokes spread over 1000x1000, or 999 in 1000 of them packed in a 5x5 square when clustered."""
+    generator = random.Random(seed)
+    chains = []
+
+    for i in range(count):
+        size = 5 if clustered and i % 1000 else 1000
+        x, y = generator.uniform(0, size), generator.uniform(0, size)
+        chains.append(LineSegmentChain.from_coordinates([x, y, x + 0.01, y + 0.01]))
+
+    return chains
+
+
+def time_ordering(chains):
+    compiler = Compiler(interfaces.Gcode, movement_speed=1000, cutting_speed=300, pass_depth=0)
+
+    start = time.perf_counter()
+    for _ in compiler._order_line_chains(chains):
+        pass
+
+    return time.perf_counter() - start
+
+
+def main(counts):
+    print(f"{'chains':>8} {'layout':>10} {'seconds':>8} {'µs/chain':>9}")
+
+    for count in counts:
+        for clustered in (False, True):
+            elapsed = time_ordering(generate_chains(count, clustered))
+            print(f"{count:>8} {'clustered' if clustered else 'uniform':>10} {elapsed:>8.2f} "
+                  f"{elapsed / count * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [5000, 20000, 100000])
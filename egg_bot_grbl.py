@@ -4,35 +4,8 @@ import os
 import inkex  # import the inkex Module so that we can use the debug function below
 from inkex import Boolean
 
-from svg_to_gcode.svg_parser import parse_root, Transformation
-
 from grbl_sender import GRBLSender
-from svg_to_gcode.compiler import Compiler, interfaces
-
-class DocumentDimensions:
-    def __init__(self, width, height):
-        self.width = width
-        self.height = height
-
-    def __str__(self):
-        return f"Width: {self.width}, Height: {self.height}"
-
-def generate_custom_interface(laser_off_command, laser_power_command):
-    """Wrapper function for generating a Gcode interface with a custom laser power command"""
-
-    class CustomInterface(interfaces.Gcode):
-        """A Gcode interface with a custom laser power command"""
-
-        def __init__(self):
-            super().__init__()
-
-        def laser_off(self):
-            return f"{laser_off_command}"
-
-        def set_laser_power(self, _):
-            return f"{laser_power_command}"
-
-    return CustomInterface
+from svg_gcode import STEPS_PER_REVOLUTION, get_document_dimensions, generate_gcode
 
 class EggBot(inkex.EffectExtension):  #This is your program
 
@@ -46,6 +19,10 @@ class EggBot(inkex.EffectExtension):  #This is your program
         add_argument("--gcode_filepath", help="Filename of Gcode file")
         add_argument("--log_filepath", help="Filename of log file")
         add_argument("--invert_y_axis", type=Boolean, help="Invert Y Axis")
+        add_argument("--wrap_x_axis", type=Boolean, help="Treat X axis as continuous rotation")
+        add_argument("--optimize_order", type=Boolean, help="Reorder paths to reduce pen-up travel")
+        add_argument("--remove_duplicates", type=Boolean, help="Skip strokes which retrace already drawn strokes")
+        add_argument("--clip_to_bed", type=Boolean, help="Cut off lines outside of the printable area")
         add_argument("--movement_speed", type=int, help="Movement speed in mm/min")
         add_argument("--cutting_speed", type=int, help="Cutting speed in mm/min")
         add_argument("--x_circumference", type=int, help="X circumference")
@@ -63,77 +40,32 @@ class EggBot(inkex.EffectExtension):  #This is your program
 
         return  # end of the program
 
-    def get_document_dimensions(self):
-        root = self.document.getroot()
-        width = root.get("width")
-        height = root.get("height")
-
-        if width is None or height is None:
-            view_box = root.get("viewBox")
-            if view_box:
-                _, _, width, height = view_box.split()
-
-        if width is None or height is None:
-            # raise ValueError("Unable to get width or height for the svg")
-            print("Unable to get width and height for the svg")
-            exit(1)
-
-        # Удаляем px/pt
-        if width and type(width) == str:
-            width = float(width.replace("px", "").replace("pt", ""))
-        if height and type(height) == str:
-            height = float(height.replace("px", "").replace("pt", ""))
-
-        return DocumentDimensions(width, height)
-
     def tab_generate_gcode(self):
-
-        output_path = self.options.gcode_filepath
         root = self.document.getroot()
-        custom_interface = generate_custom_interface(self.options.pen_up_command, self.options.pen_down_command)
-
-        bed_width = int(self.options.bed_width)
-        bed_height = int(self.options.bed_height)
-
-        custom_header = [
-            'G21',
-            'G10 P0 L20 X0 Y%.2f' % (bed_height / 2),
-        ]
-        custom_footer = [
-            self.options.pen_up_command,
-            'G1 X0 Y%.2f' % (bed_height / 2),
-        ]
-        gcode_compiler = Compiler(custom_interface,
-                  movement_speed=self.options.movement_speed,
-                  cutting_speed=self.options.cutting_speed,
-                  pass_depth=1,
-                  custom_header=custom_header,
-                  custom_footer=custom_footer
-        )
-
-        transformation = Transformation()
 
-        transformation.add_translation(0, 0)
-
-        dimensions = self.get_document_dimensions()
-        width = dimensions.width
-        height = dimensions.height
-
-        scale_x = bed_width / float(width)
-        scale_y = bed_height / float(height)
-        scale = min(scale_x, scale_y)
-        if scale > 1:
-            scale = 1
-
-        transformation.add_scale(scale)
-
-        curves = parse_root(root, transform_origin=not self.options.invert_y_axis, root_transformation=transformation, canvas_height=41)
+        try:
+            dimensions = get_document_dimensions(root)
+        except ValueError:
+            inkex.utils.errormsg("Не удалось определить ширину и высоту SVG")
+            return 1
 
-        gcode_compiler.append_curves(curves)
+        statistics = generate_gcode(root, dimensions, self.options, self.options.gcode_filepath)
 
+        if statistics.get("merged_segments") or statistics.get("slowed_segments"):
+            inkex.utils.errormsg(
+                "Сегментов в секунду: запланировано %.0f, допустимо %.0f, после адаптации %.0f. "
+                "Объединено сегментов: %d, замедлено: %d" % (
+                    statistics["planned_segment_rate"], statistics["budgeted_segment_rate"],
+                    statistics["emitted_segment_rate"], statistics["merged_segments"], statistics["slowed_segments"]))
 
+        if statistics.get("duplicate_chains") or statistics.get("overlapping_segments"):
+            inkex.utils.errormsg(
+                "Удалено повторяющихся контуров: %d, перекрывающихся отрезков: %d" % (
+                    statistics["duplicate_chains"], statistics["overlapping_segments"]))
 
-        gcode_compiler.compile_to_file(output_path, passes=1)
+        if statistics.get("clipped_length"):
+            inkex.utils.errormsg(
+                "Обрезано линий за пределами области печати: %.1f мм" % statistics["clipped_length"])
 
         return self.document
     def tab_connection(self):
@@ -212,8 +144,8 @@ class EggBot(inkex.EffectExtension):  #This is your program
             lines = [
                 '$1 = 255',
                 '$32 = 0',
-                "$100 = %.3f" % (3200 / int(self.options.x_circumference)),
-                "$101 = %.3f" % (3200 / int(self.options.y_circumference)),
+                "$100 = %.3f" % (STEPS_PER_REVOLUTION / int(self.options.x_circumference)),
+                "$101 = %.3f" % (STEPS_PER_REVOLUTION / int(self.options.y_circumference)),
                 '$110 = %d' % int(self.options.x_axis_maximum_rate),
                 '$111 = %d' % int(self.options.y_axis_maximum_rate),
                 '$120 = %d' % int(self.options.x_axis_accel),
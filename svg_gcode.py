@@ -1,6 +1,40 @@
-from svg_to_gcode.svg_parser import parse_file
+#!/usr/bin/env python
+"""
+Converts svg files to G-Code for the EggBot without Inkscape. The G-Code is generated exactly like the Generate G-Code
+tab of the extension does, which relies on the functions of this module as well.
+
+Usage example:
+    python svg_gcode.py designs/ extra/*.svg --output_dir gcode --pen_up_command "M3 S75;" --jobs 4
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.etree import ElementTree
+
+from svg_to_gcode.svg_parser import iter_parse_root, Transformation
 from svg_to_gcode.compiler import Compiler, interfaces
 
+# Микрошагов на полный оборот оси (200 шагов * 16 микрошагов)
+STEPS_PER_REVOLUTION = 3200
+# Скорость порта, с которой GRBLSender отправляет G-Code
+BAUD_RATE = 115200
+
+# Options of the command line tool which don't affect the generated G-Code
+_BATCH_OPTIONS = ("inputs", "output_dir", "jobs", "skip")
+
+
+class DocumentDimensions:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def __str__(self):
+        return f"Width: {self.width}, Height: {self.height}"
+
 
 def generate_custom_interface(laser_off_command, laser_power_command):
     """Wrapper function for generating a Gcode interface with a custom laser power command"""
@@ -19,14 +53,264 @@ def generate_custom_interface(laser_off_command, laser_power_command):
 
     return CustomInterface
 
-# custom_interface = generate_custom_interface(f"M3 S20;", f"M3 S70;")
-#
-#
-# grbl_conf = open("grbl.conf").read().splitlines()
-# # Instantiate a compiler, specifying the custom interface and the speed at which the tool should move.
-# gcode_compiler = Compiler(custom_interface, movement_speed=1000, cutting_speed=300, pass_depth=1, custom_header=grbl_conf)
-#
-# curves = parse_file("drawing.svg", canvas_height=41, transform_origin=False) # Parse an svg file into geometric curves
-#
-# gcode_compiler.append_curves(curves)
-# gcode_compiler.compile_to_file("drawing.gcode")
\ No newline at end of file
+
+def get_document_dimensions(root: ElementTree.Element) -> DocumentDimensions:
+    """Read the size of an svg document from its width and height attributes, or else from its viewBox."""
+    width = root.get("width")
+    height = root.get("height")
+
+    if width is None or height is None:
+        view_box = root.get("viewBox")
+        if view_box:
+            _, _, width, height = view_box.split()
+
+    if width is None or height is None:
+        raise ValueError("Unable to get width and height for the svg")
+
+    # Удаляем px/pt
+    if width and type(width) == str:
+        width = float(width.replace("px", "").replace("pt", ""))
+    if height and type(height) == str:
+        height = float(height.replace("px", "").replace("pt", ""))
+
+    return DocumentDimensions(width, height)
+
+
+def generate_gcode(root: ElementTree.Element, dimensions: DocumentDimensions, options, output_path: str) -> dict:
+    """
+    Generate the G-Code of an svg document and write it to a file.
+
+    :param root: the svg document's root.
+    :param dimensions: the size of the document, which is scaled down to fit the bed.
+    :param options: the generation settings, named like the arguments of the extension (pen_up_command, bed_width...).
+    :param output_path: the path of the G-Code file.
+    :return: the compiler's statistics.
+    """
+    custom_interface = generate_custom_interface(options.pen_up_command, options.pen_down_command)
+
+    bed_width = int(options.bed_width)
+    bed_height = int(options.bed_height)
+
+    custom_header = [
+        'G21',
+        'G10 P0 L20 X0 Y%.2f' % (bed_height / 2),
+    ]
+    custom_footer = [
+        options.pen_up_command,
+        'G1 X0 Y%.2f' % (bed_height / 2),
+    ]
+
+    # A rotating egg has no limits along the X axis
+    clip_box = None
+    if options.clip_to_bed:
+        clip_box = (None, 0, None, bed_height) if options.wrap_x_axis else (0, 0, bed_width, bed_height)
+
+    gcode_compiler = Compiler(custom_interface,
+              movement_speed=options.movement_speed,
+              cutting_speed=options.cutting_speed,
+              pass_depth=1,
+              custom_header=custom_header,
+              custom_footer=custom_footer,
+              x_circumference=int(options.x_circumference) if options.wrap_x_axis else None,
+              steps_per_mm=(STEPS_PER_REVOLUTION / int(options.x_circumference),
+                            STEPS_PER_REVOLUTION / int(options.y_circumference)),
+              baud_rate=BAUD_RATE,
+              acceleration=min(int(options.x_axis_accel), int(options.y_axis_accel)),
+              optimize_order=options.optimize_order,
+              remove_duplicates=options.remove_duplicates,
+              clip_box=clip_box
+    )
+
+    transformation = Transformation()
+
+    transformation.add_translation(0, 0)
+
+    scale_x = bed_width / float(dimensions.width)
+    scale_y = bed_height / float(dimensions.height)
+    scale = min(scale_x, scale_y)
+    if scale > 1:
+        scale = 1
+
+    transformation.add_scale(scale)
+
+    curves = iter_parse_root(root, transform_origin=not options.invert_y_axis, root_transformation=transformation,
+                             canvas_height=41)
+
+    gcode_compiler.append_curves(curves)
+
+    gcode_compiler.compile_to_file(output_path, passes=1)
+
+    return gcode_compiler.statistics
+
+
+def convert_file(svg_path: str, gcode_path: str, options, digests=()) -> float:
+    """
+    Convert a single svg file. Runs in the worker processes of the command line tool.
+
+    :param digests: if specified, written next to the G-Code file once it's generated, one per line. See
+    _settings_digest and _source_digest.
+    :return: the time the conversion took, in seconds.
+    """
+    start = time.perf_counter()
+
+    root = ElementTree.parse(svg_path).getroot()
+    generate_gcode(root, get_document_dimensions(root), options, gcode_path)
+
+    if digests:
+        with open(gcode_path + ".sha256", "w") as digest_file:
+            digest_file.write("\n".join(digests))
+
+    return time.perf_counter() - start
+
+
+def _settings_digest(options) -> str:
+    """Hash the settings which affect the G-Code. Changing them means every G-Code file is outdated."""
+    settings = sorted((key, value) for key, value in vars(options).items() if key not in _BATCH_OPTIONS)
+    return hashlib.sha256(repr(settings).encode()).hexdigest()
+
+
+def _source_digest(svg_path: str, settings_digest: str) -> str:
+    """Hash an svg file along with the settings it's converted with. Either changing means the G-Code is outdated."""
+    digest = hashlib.sha256(settings_digest.encode())
+    with open(svg_path, "rb") as svg_file:
+        for block in iter(lambda: svg_file.read(1 << 16), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _is_up_to_date(svg_path: str, gcode_path: str, skip: str, digests: tuple) -> bool:
+    """
+    Check whether a G-Code file was generated from the current svg file with the current settings.
+
+    :param digests: the digests convert_file would write: the settings digest, followed by the source digest in hash
+    mode. In either mode, the G-Code is outdated if it was generated with other settings.
+    """
+    if skip == "never" or not os.path.exists(gcode_path):
+        return False
+
+    try:
+        with open(gcode_path + ".sha256") as digest_file:
+            if tuple(digest_file.read().split()) != digests:
+                return False
+    except OSError:
+        return False
+
+    return skip == "hash" or os.path.getmtime(gcode_path) >= os.path.getmtime(svg_path)
+
+
+def _find_svg_files(inputs) -> list:
+    """Expand files, glob patterns and directories (whose svg files are all converted) into a list of svg files."""
+    svg_paths = []
+
+    for pattern in inputs:
+        matches = sorted(glob.glob(pattern))
+
+        if not matches:
+            raise ValueError(f"No such file or directory: {pattern}")
+
+        for match in matches:
+            if os.path.isdir(match):
+                svg_paths.extend(sorted(glob.glob(os.path.join(match, "*.svg"))))
+            else:
+                svg_paths.append(match)
+
+    # The same file may be matched by several inputs
+    return list(dict.fromkeys(svg_paths))
+
+
+def _boolean(value: str) -> bool:
+    """Parse boolean options the way Inkscape passes them to the extension"""
+    if value.lower() not in ("true", "false"):
+        raise argparse.ArgumentTypeError(f"Expected true or false. Not {value}")
+
+    return value.lower() == "true"
+
+
+def _argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Convert svg files to G-Code for the EggBot, with the same settings "
+                                                 "as the Inkscape extension. Defaults match the extension's.")
+    add_argument = parser.add_argument
+
+    add_argument("inputs", nargs="+", help="svg files, glob patterns or directories")
+    add_argument("--output_dir", help="Directory of the G-Code files. Defaults to the directory of each svg file")
+    add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of files converted in parallel")
+    add_argument("--skip", choices=("mtime", "hash", "never"), default="mtime",
+                 help="Skip files whose G-Code is up to date: generated with the same settings and newer than the svg "
+                      "file (mtime), or generated from the same svg content and settings (hash)")
+
+    add_argument("--pen_up_command", default="M3 S75;", help="Pen Up Command")
+    add_argument("--pen_down_command", default="M3 S90;", help="Pen Down Command")
+    add_argument("--invert_y_axis", type=_boolean, default=False, help="Invert Y Axis")
+    add_argument("--wrap_x_axis", type=_boolean, default=False, help="Treat X axis as continuous rotation")
+    add_argument("--optimize_order", type=_boolean, default=True, help="Reorder paths to reduce pen-up travel")
+    add_argument("--remove_duplicates", type=_boolean, default=True,
+                 help="Skip strokes which retrace already drawn strokes")
+    add_argument("--clip_to_bed", type=_boolean, default=True, help="Cut off lines outside of the printable area")
+    add_argument("--movement_speed", type=int, default=4000, help="Movement speed in mm/min")
+    add_argument("--cutting_speed", type=int, default=1000, help="Cutting speed in mm/min")
+    add_argument("--x_circumference", type=int, default=144, help="X circumference")
+    add_argument("--y_circumference", type=int, default=150, help="Y circumference")
+    add_argument("--x_axis_accel", type=int, default=50, help="X-axis acceleration, mm/sec^2")
+    add_argument("--y_axis_accel", type=int, default=50, help="Y-axis acceleration, mm/sec^2")
+    add_argument("--bed_width", type=int, default=144, help="X-axis maximum travel, millimeters")
+    add_argument("--bed_height", type=int, default=42, help="Y-axis maximum travel, millimeters")
+
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = _argument_parser()
+    options = parser.parse_args(argv)
+
+    try:
+        svg_paths = _find_svg_files(options.inputs)
+    except ValueError as value_error:
+        parser.error(str(value_error))
+
+    gcode_paths = [os.path.splitext(svg_path)[0] + ".gcode" for svg_path in svg_paths]
+    if options.output_dir:
+        os.makedirs(options.output_dir, exist_ok=True)
+        gcode_paths = [os.path.join(options.output_dir, os.path.basename(path)) for path in gcode_paths]
+
+        if len(set(gcode_paths)) != len(gcode_paths):
+            parser.error("Several svg files share the same name, they would overwrite each other in --output_dir")
+
+    start = time.perf_counter()
+    skipped = failed = 0
+
+    settings_digest = _settings_digest(options)
+
+    with ProcessPoolExecutor(options.jobs) as executor:
+        futures = {}
+
+        for svg_path, gcode_path in zip(svg_paths, gcode_paths):
+            digests = (settings_digest,)
+            if options.skip == "hash":
+                digests += (_source_digest(svg_path, settings_digest),)
+
+            if _is_up_to_date(svg_path, gcode_path, options.skip, digests):
+                skipped += 1
+                continue
+
+            futures[executor.submit(convert_file, svg_path, gcode_path, options, digests)] = svg_path, gcode_path
+
+        for future in as_completed(futures):
+            svg_path, gcode_path = futures[future]
+
+            try:
+                elapsed = future.result()
+            except Exception as exception:
+                failed += 1
+                print(f"{svg_path}: {type(exception).__name__}: {exception}", file=sys.stderr)
+            else:
+                print(f"{svg_path} -> {gcode_path} ({elapsed:.2f} s)")
+
+    print(f"Converted {len(futures) - failed}, skipped {skipped} up to date, failed {failed} "
+          f"in {time.perf_counter() - start:.2f} s")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,12 @@
+import math
 import typing
 import warnings
 
 from svg_to_gcode.compiler.interfaces import Interface
-from svg_to_gcode.geometry import Curve, Line
-from svg_to_gcode.geometry import LineSegmentChain
+from svg_to_gcode.geometry import Curve, Line, Vector
+from svg_to_gcode.geometry import LineSegmentChain, SpatialIndex, DuplicateFilter
 from svg_to_gcode import UNITS, TOLERANCES
+from svg_to_gcode import formulas
 
 
 class Compiler:
@@ -14,7 +16,9 @@ class Compiler:
     """
 
     def __init__(self, interface_class: typing.Type[Interface], movement_speed, cutting_speed, pass_depth,
-                 dwell_time=0, unit=None, custom_header=None, custom_footer=None):
+                 dwell_time=0, unit=None, custom_header=None, custom_footer=None, x_circumference=None,
+                 steps_per_mm=None, min_segment_length=None, baud_rate=None, planner_blocks=15, acceleration=None,
+                 bytes_per_line=30, optimize_order=False, remove_duplicates=False, clip_box=None):
         """
 
         :param interface_class: Specify which interface to use. The ost common is the gcode interface.
@@ -25,6 +29,25 @@ class Compiler:
         :param unit: specify a unit to the machine
         :param custom_header: A list of commands to be executed before all generated commands. Default is [laser_off,]
         :param custom_footer: A list of commands to be executed after all generated commands. Default is [laser_off,]
+        :param x_circumference: if specified, the x-axis is treated as a rotational axis which completes a full turn every
+        x_circumference units (eg. the egg of an eggbot). Travel moves take the shortest rotational direction and the
+        x-axis is periodically re-zeroed to keep coordinates bounded.
+        :param steps_per_mm: the resolution of the machine, either as a single number or as an (x, y) pair. Eg. grbl's
+        ($100, $101). Moves which wouldn't advance any motor by a full step are merged into the following move.
+        :param min_segment_length: moves shorter than this length are merged into the following move.
+        :param baud_rate: if specified, limit the number of segments per second so that the serial link can keep up with
+        the commanded cutting speed. Short segments are coarsened within tolerance, or slowed down when that's not
+        possible. Speeds are assumed to be given per minute.
+        :param planner_blocks: the depth of the machine's motion planner. (15 for grbl on an atmega328p)
+        :param acceleration: the machine's acceleration (units/sec^2). If specified, segments are kept long enough for
+        the planner to always be able to stop within its queued blocks.
+        :param bytes_per_line: the average length of a movement command sent over the serial link.
+        :param optimize_order: whether to reorder the chains passed to append_curves to reduce travel. Chains are drawn
+        nearest-first, open chains may be drawn in reverse and closed chains start at their vertex nearest to the tool.
+        :param remove_duplicates: whether to skip strokes passed to append_curves which retrace strokes that were already
+        drawn. Eg. duplicated paths or a fill outline coinciding with a stroke. See geometry.DuplicateFilter.
+        :param clip_box: if specified, a (min_x, min_y, max_x, max_y) rectangle outside of which append_curves draws
+        nothing, eg. the machine's travel limits. Chains are cut where they leave it. A None bound leaves its side open.
         """
         self.interface = interface_class()
         self.movement_speed = movement_speed
@@ -32,6 +55,46 @@ class Compiler:
         self.pass_depth = abs(pass_depth)
         self.dwell_time = dwell_time
 
+        if x_circumference is not None and x_circumference <= 0:
+            raise ValueError(f"x_circumference must be a positive number. Not {x_circumference}")
+
+        self.x_circumference = x_circumference
+
+        if steps_per_mm is None:
+            self.step_size = None
+        else:
+            steps_x, steps_y = steps_per_mm if isinstance(steps_per_mm, (tuple, list)) else (steps_per_mm, steps_per_mm)
+
+            if steps_x <= 0 or steps_y <= 0:
+                raise ValueError(f"steps_per_mm must be positive. Not {steps_per_mm}")
+
+            self.step_size = (1 / steps_x, 1 / steps_y)
+
+        self.min_segment_length = min_segment_length
+
+        if baud_rate is not None and baud_rate <= 0:
+            raise ValueError(f"baud_rate must be a positive number. Not {baud_rate}")
+
+        # Serial links use 10 bits per byte (8 data bits, a start bit and a stop bit)
+        self.segment_rate_budget = baud_rate / 10 / bytes_per_line if baud_rate else None
+        self.planner_blocks = planner_blocks
+        self.acceleration = acceleration
+
+        self.optimize_order = optimize_order
+        self.duplicate_filter = DuplicateFilter() if remove_duplicates else None
+
+        if clip_box is not None:
+            clip_box = tuple(default if bound is None else bound
+                             for bound, default in zip(clip_box, (-math.inf, -math.inf, math.inf, math.inf)))
+
+            if clip_box[0] > clip_box[2] or clip_box[1] > clip_box[3]:
+                raise ValueError(f"clip_box must be given as (min_x, min_y, max_x, max_y). Not {clip_box}")
+
+        self.clip_box = clip_box
+
+        # Figures collected while drawing, useful for reporting. Eg. the planned vs budgeted segment rate.
+        self.statistics = {}
+
         if (unit is not None) and (unit not in UNITS):
             raise ValueError(f"Unknown unit {unit}. Please specify one of the following: {UNITS}")
         
@@ -107,34 +170,244 @@ class Compiler:
 
         code = []
 
-        start = line_chain.get(0).start
+        points = list(line_chain.vertices())
+
+        start = Vector(*points[0])
+        x_offset = self._x_offset(start.x)
 
         # Don't dwell and turn off laser if the new start is at the current position
-        if self.interface.position is None or abs(self.interface.position - start) > TOLERANCES["operation"]:
+        if self.interface.position is None or \
+                abs(self.interface.position - Vector(start.x + x_offset, start.y)) > TOLERANCES["operation"]:
+
+            code = [self.interface.laser_off(), self.interface.set_movement_speed(self.movement_speed)]
 
-            code = [self.interface.laser_off(), self.interface.set_movement_speed(self.movement_speed),
-                    self.interface.linear_move(start.x, start.y), self.interface.set_movement_speed(self.cutting_speed),
-                    self.interface.set_laser_power(1)]
+            # Re-zero the rotational axis while the tool is off, then travel the shortest way around
+            position = self.interface.position
+            if self.x_circumference and position is not None and abs(position.x) >= self.x_circumference:
+                code.append(self.interface.set_position(x=position.x % self.x_circumference))
+                x_offset = self._x_offset(start.x)
+
+            code.extend([self.interface.linear_move(start.x + x_offset, start.y),
+                         self.interface.set_movement_speed(self.cutting_speed),
+                         self.interface.set_laser_power(1)])
 
             if self.dwell_time > 0:
                 code = [self.interface.dwell(self.dwell_time)] + code
 
-        for line in line_chain:
-            code.append(self.interface.linear_move(line.end.x, line.end.y))
+        points = self._drop_sub_step_segments(points)
+        points, speeds = self._apply_segment_budget(points)
+
+        # The offset stays constant along the chain, so paths which cross the seam are drawn without reversing
+        for (x, y), speed in zip(points[1:], speeds):
+            code.append(self.interface.set_movement_speed(speed))
+            code.append(self.interface.linear_move(x + x_offset, y))
 
         self.body.extend(code)
 
-    def append_curves(self, curves: [typing.Type[Curve]]):
+    def _is_sub_step(self, point1, point2):
+        """Check whether a move between two points is below the machine's resolution."""
+        dx, dy = abs(point2[0] - point1[0]), abs(point2[1] - point1[1])
+
+        if self.step_size is not None and dx < self.step_size[0] and dy < self.step_size[1]:
+            return True
+
+        return self.min_segment_length is not None and math.hypot(dx, dy) < self.min_segment_length
+
+    def _drop_sub_step_segments(self, points):
+        """
+        Drop the vertices of a polyline which are closer to the last kept vertex than the machine's resolution. The
+        first and last vertices are always kept. Because distances are measured from the last kept vertex, rather than
+        from the previous vertex, errors don't accumulate: every dropped vertex is within two steps of the result.
+        """
+        if self.step_size is None and self.min_segment_length is None:
+            return points
+
+        kept = [points[0]]
+        for point in points[1:-1]:
+            if not self._is_sub_step(kept[-1], point):
+                kept.append(point)
+
+        # Keep the end of the chain exact. If it's too close to the last kept vertex, the vertex is merged into it.
+        if len(kept) > 1 and self._is_sub_step(kept[-1], points[-1]):
+            kept.pop()
+
+        kept.append(points[-1])
+        return kept
+
+    def _x_offset(self, x):
+        """
+        Return the whole number of x_circumference turns which must be added to x to reach it from the current position
+        in the shortest rotational direction. Always 0 if the x-axis isn't rotational.
+        """
+        if not self.x_circumference or self.interface.position is None:
+            return 0
+
+        return formulas.periodic_offset(x, self.interface.position.x, self.x_circumference)
+
+    def _minimum_segment_length(self, speed):
+        """
+        Return the shortest segment which can be drawn at a given speed (units/min) without starving the planner.
+        Segments must take longer to execute than to be transmitted, and the queued blocks must be long enough to
+        decelerate to a stop.
+        """
+        speed /= 60
+        minimum_length = speed / self.segment_rate_budget
+
+        if self.acceleration:
+            minimum_length = max(minimum_length, speed ** 2 / (2 * self.acceleration * self.planner_blocks))
+
+        return minimum_length
+
+    def _maximum_segment_speed(self, length):
+        """Return the highest speed (units/min) at which a segment of a given length can be drawn. Inverse of the above."""
+        speed = length * self.segment_rate_budget
+
+        if self.acceleration:
+            speed = min(speed, math.sqrt(2 * self.acceleration * self.planner_blocks * length))
+
+        return speed * 60
+
+    def _apply_segment_budget(self, points):
+        """
+        Coarsen a polyline so that its segments can be transmitted as fast as they're drawn. Vertices are merged into
+        longer chords as long as the skipped vertices stay within the approximation tolerance. Segments which still
+        can't be coarsened are drawn at a locally reduced speed.
+
+        :return: the coarsened points and the speed of every segment.
+        """
+        if self.segment_rate_budget is None:
+            return points, [self.cutting_speed] * (len(points) - 1)
+
+        minimum_length = self._minimum_segment_length(self.cutting_speed)
+        tolerance = TOLERANCES["approximation"]
+
+        def within_tolerance(start, end):
+            x1, y1 = points[start]
+            x2, y2 = points[end]
+            return all(formulas.segment_distance(*points[k], x1, y1, x2, y2) <= tolerance for k in range(start + 1, end))
+
+        kept = [points[0]]
+        speeds = []
+
+        i = 0
+        while i < len(points) - 1:
+            j = i + 1
+            while j < len(points) - 1 and math.dist(points[i], points[j]) < minimum_length \
+                    and within_tolerance(i, j + 1):
+                j += 1
+
+            length = math.dist(points[i], points[j])
+            speed = self.cutting_speed
+
+            if length < minimum_length:
+                speed = max(1, math.floor(self._maximum_segment_speed(length)))
+
+            kept.append(points[j])
+            speeds.append(speed)
+            i = j
+
+        planned_rates = [self.cutting_speed / 60 / math.dist(point1, point2)
+                         for point1, point2 in zip(points, points[1:]) if point1 != point2]
+        emitted_rates = [speed / 60 / math.dist(point1, point2)
+                         for point1, point2, speed in zip(kept, kept[1:], speeds) if point1 != point2]
+
+        statistics = self.statistics
+        statistics["budgeted_segment_rate"] = self.segment_rate_budget
+        statistics["planned_segment_rate"] = max([statistics.get("planned_segment_rate", 0)] + planned_rates)
+        statistics["emitted_segment_rate"] = max([statistics.get("emitted_segment_rate", 0)] + emitted_rates)
+        statistics["merged_segments"] = statistics.get("merged_segments", 0) + len(points) - len(kept)
+        statistics["slowed_segments"] = statistics.get("slowed_segments", 0) + \
+            sum(speed != self.cutting_speed for speed in speeds)
+
+        return kept, speeds
+
+    def append_curves(self, curves: typing.Iterable[Curve]):
         """
         Draws curves by approximating them as line segments and calling self.append_line_chain(). The resulting code is
         appended to self.body
+
+        curves may be any iterable, eg. svg_parser.iter_parse_file(). Curves are drawn as they arrive, unless
+        optimize_order is set, which requires all of them to be known before drawing.
         """
 
-        for curve in curves:
-            line_chain = LineSegmentChain()
+        line_chains = self._join_approximations(curves)
+
+        if self.clip_box:
+            line_chains = self._clip_line_chains(line_chains)
+
+        if self.duplicate_filter:
+            line_chains = self.duplicate_filter.filter(line_chains)
+
+        if self.optimize_order:
+            line_chains = self._order_line_chains(list(line_chains))
+
+        for line_chain in line_chains:
+            self.append_line_chain(line_chain)
 
+        if self.duplicate_filter:
+            self.statistics["duplicate_chains"] = self.duplicate_filter.removed_chains
+            self.statistics["overlapping_segments"] = self.duplicate_filter.removed_segments
+
+    @staticmethod
+    def _join_approximations(curves):
+        """Approximate curves as line segments, joining consecutive continuous curves into a single LineSegmentChain."""
+        line_chain = LineSegmentChain()
+
+        for curve in curves:
             approximation = LineSegmentChain.line_segment_approximation(curve)
 
+            if approximation.chain_size() == 0:
+                continue
+
+            if line_chain.chain_size() > 0 and \
+                    math.dist(line_chain.vertex(-1), approximation.vertex(0)) > TOLERANCES['input']:
+                yield line_chain
+                line_chain = LineSegmentChain()
+
             line_chain.extend(approximation)
 
-            self.append_line_chain(line_chain)
+        if line_chain.chain_size() > 0:
+            yield line_chain
+
+    def _clip_line_chains(self, line_chains):
+        """Cut line chains to self.clip_box, adding up the length which was cut off in self.statistics."""
+        for line_chain in line_chains:
+            pieces = line_chain.clipped(*self.clip_box)
+
+            if len(pieces) != 1 or pieces[0] is not line_chain:
+                clipped_length = line_chain.length() - sum(piece.length() for piece in pieces)
+                self.statistics["clipped_length"] = self.statistics.get("clipped_length", 0) + clipped_length
+
+            yield from pieces
+
+    def _order_line_chains(self, line_chains: [LineSegmentChain]):
+        """
+        Greedily order line chains so that the next chain is always the one nearest to the tool. Open chains are reversed
+        if their end is closer than their start. Closed chains are rotated to start at their vertex nearest to the tool.
+
+        Nearest chains are looked up in a SpatialIndex, so ordering takes roughly linear (n log n) time in the number of
+        chains, however they are spread. See benchmarks/order_chains.py.
+        """
+        if not line_chains:
+            return
+
+        index = SpatialIndex(line_chains, x_period=self.x_circumference, index_closed_vertices=True)
+
+        position = self.interface.position
+        position = line_chains[0].vertex(0) if position is None else (position.x, position.y)
+
+        while len(index):
+            _, chain_index, vertex_index = index.nearest(*position)
+            index.remove(chain_index)
+
+            line_chain = line_chains[chain_index]
+            last_index = line_chain.vertex_count() - 1
+
+            if line_chain.is_closed():
+                if 0 < vertex_index < last_index:
+                    line_chain = line_chain.rotated_chain(vertex_index)
+            elif vertex_index == last_index:
+                line_chain = line_chain.reversed_chain()
+
+            position = line_chain.vertex(-1)
+            yield line_chain
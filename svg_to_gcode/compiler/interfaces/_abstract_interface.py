@@ -89,6 +89,15 @@ class Interface:
         """
         pass
 
+    def set_position(self, x=None, y=None, z=None) -> str:
+        """
+        Optional method, if implemented redefines the coordinates of the current tool position without moving the
+        tool. Only the given axes are redefined.
+
+        :return: Appropriate command. If not implemented return ''.
+        """
+        pass
+
     def set_unit(self, unit):
         """
         Optional method, if implemented Specifies the unit of measurement.
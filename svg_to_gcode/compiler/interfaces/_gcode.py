@@ -82,6 +82,21 @@ class Gcode(Interface):
         self.position = Vector(0, 0)
         return "G92 X0 Y0 Z0;"
 
+    def set_position(self, x=None, y=None, z=None):
+        if x is None and y is None and z is None:
+            warnings.warn("set_position command invoked without arguments.")
+            return ''
+
+        command = "G92"
+        command += f" X{x:.{self.precision}f}" if x is not None else ''
+        command += f" Y{y:.{self.precision}f}" if y is not None else ''
+        command += f" Z{z:.{self.precision}f}" if z is not None else ''
+
+        if self.position is not None:
+            self.position = Vector(self.position.x if x is None else x, self.position.y if y is None else y)
+
+        return command + ';'
+
     def set_unit(self, unit):
         if unit == "mm":
             return "G21;"
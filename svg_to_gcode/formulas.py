@@ -63,6 +63,28 @@ def tangent_arc_center(c, p, g):
             ) / (g * (-p_c + c_c) + c * (p_c - g_c) + (-c_c + g_c) * p)
 
 
+# 8-point Gauss-Legendre quadrature on [-1, 1] as (node, weight) pairs
+GAUSS_LEGENDRE_8 = [
+    (-0.9602898564975363, 0.1012285362903763), (0.9602898564975363, 0.1012285362903763),
+    (-0.7966664774136267, 0.2223810344533745), (0.7966664774136267, 0.2223810344533745),
+    (-0.5255324099163290, 0.3137066458778873), (0.5255324099163290, 0.3137066458778873),
+    (-0.1834346424956498, 0.3626837833783620), (0.1834346424956498, 0.3626837833783620),
+]
+
+
+def gauss_legendre_integral(function, a, b, subintervals=1):
+    """Integrate function over [a, b] with composite 8-point Gauss-Legendre quadrature"""
+    step = (b - a) / subintervals
+    half_step = step / 2
+
+    total = 0
+    for i in range(subintervals):
+        middle = a + (i + 0.5) * step
+        total += sum(weight * function(middle + half_step * node) for node, weight in GAUSS_LEGENDRE_8)
+
+    return total * half_step
+
+
 def linear_map(min, max, t):
     """Linear map from t∈[0, 1] --> t'∈[min, max]"""
     return (max - min) * t + min
@@ -73,6 +95,52 @@ def inv_linear_map(min, max, t_p):
     return (t_p - min)/(max - min)
 
 
+def periodic_offset(value, reference, period):
+    """Find the whole number of periods which must be added to value to bring it as close as possible to reference"""
+    return round((reference - value) / period) * period
+
+
+def segment_distance(x, y, x1, y1, x2, y2):
+    """Compute the distance between the point (x, y) and the line segment (x1, y1)(x2, y2)"""
+    dx, dy = x2 - x1, y2 - y1
+    squared_length = dx * dx + dy * dy
+
+    t = 0 if squared_length == 0 else ((x - x1) * dx + (y - y1) * dy) / squared_length
+    t = min(1, max(0, t))
+
+    return math.hypot(x - x1 - t * dx, y - y1 - t * dy)
+
+
+def largest_singular_value(a, b, c, d):
+    """
+    Compute the largest factor by which the linear map [[a, c], [b, d]] stretches vectors (its largest singular value).
+    Eg. the largest semi-axis of the ellipse it maps the unit circle to.
+    """
+    squared_sum = (a * a + b * b + c * c + d * d) / 2
+    determinant = a * d - b * c
+    return math.sqrt(squared_sum + math.sqrt(max(0, squared_sum ** 2 - determinant ** 2)))
+
+
+def clip_segment(x1, y1, x2, y2, min_x, min_y, max_x, max_y):
+    """
+    Clip the line segment (x1, y1)(x2, y2) to a rectangle (Liang-Barsky). Return the (t0, t1) parameter range of the
+    segment lying inside the rectangle, or None if it lies entirely outside. Bounds may be infinite.
+    """
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = 0.0, 1.0
+
+    for p, q in ((-dx, x1 - min_x), (dx, max_x - x1), (-dy, y1 - min_y), (dy, max_y - y1)):
+        if p == 0:
+            if q < 0:
+                return None
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+
+    return (t0, t1) if t0 <= t1 else None
+
+
 def angle_between_vectors(v1, v2):
     """Compute angle between two vectors v1, v2"""
     cos_angle = Vector.dot_product(v1, v2) / (abs(v1) * abs(v2))
@@ -21,3 +21,6 @@ from svg_to_gcode.geometry._cubic_bazier import CubicBazier
 from svg_to_gcode.geometry._abstract_chain import Chain
 from svg_to_gcode.geometry._line_segment_chain import LineSegmentChain
 from svg_to_gcode.geometry._smooth_arc_chain import SmoothArcChain
+
+from svg_to_gcode.geometry._spatial_index import SpatialIndex
+from svg_to_gcode.geometry._duplicate_filter import DuplicateFilter
@@ -1,3 +1,5 @@
+from array import array
+from bisect import bisect_right
 from collections.abc import Iterable
 
 from svg_to_gcode.geometry import Curve
@@ -11,11 +13,15 @@ class Chain(Curve):
     and derivative() methods.
     """
 
-    __slots__ = '_curves'
+    __slots__ = '_curves', '_cumulative_lengths'
 
     def __init__(self, curves=None):
         self._curves = []
 
+        # _cumulative_lengths[i] is the length of the first i+1 curves. It's extended on demand, so it may cover fewer
+        # curves than the chain holds, but removals must keep it consistent.
+        self._cumulative_lengths = array('d')
+
         if curves is not None:
             self.extend(curves)
 
@@ -27,7 +33,8 @@ class Chain(Curve):
         Return the geometric length of the chain.
         The __len__ magic method wasn't overridden to avoid ambiguity between total length and chain size.
         """
-        return sum([curve.length() for curve in self._curves])
+        cumulative_lengths = self._cumulative_length_index()
+        return cumulative_lengths[-1] if cumulative_lengths else 0
 
     def chain_size(self):
         """
@@ -58,33 +65,66 @@ class Chain(Curve):
             return
 
         if self._curves:
-            assert self.append(chain._curves[0])
+            self.append(chain._curves[0])
+        else:
+            self._curves.append(chain._curves[0])
 
         self._curves.extend(chain._curves[1:])
 
     def remove_from_first(self, number_of_curves: int):
         """Remove n curves starting from the first"""
-        for i in range(number_of_curves):
-            self._curves.pop(0)
+        del self._curves[:number_of_curves]
+        self._shift_cumulative_lengths(number_of_curves)
 
     def remove_from_last(self, number_of_curves: int):
         """Remove n curves starting from the last"""
-        for i in range(len(self._curves) - 1, number_of_curves + 1, -1):
-            self._curves.pop(-1)
+        if number_of_curves > 0:
+            del self._curves[-number_of_curves:]
+            del self._cumulative_lengths[self.chain_size():]
+
+    def _curve_lengths(self, first_index: int):
+        """Yield the length of every curve starting from a given index."""
+        for curve in self._curves[first_index:]:
+            yield curve.length()
+
+    def _cumulative_length_index(self):
+        """Return the cumulative lengths of all curves, extending the index with curves appended since the last call."""
+        cumulative_lengths = self._cumulative_lengths
+
+        if len(cumulative_lengths) < self.chain_size():
+            total = cumulative_lengths[-1] if cumulative_lengths else 0
+
+            for length in self._curve_lengths(len(cumulative_lengths)):
+                total += length
+                cumulative_lengths.append(total)
+
+        return cumulative_lengths
+
+    def _shift_cumulative_lengths(self, number_of_curves: int):
+        """Update the cumulative lengths after removing a number of curves from the start of the chain."""
+        cumulative_lengths = self._cumulative_lengths
+
+        if number_of_curves >= len(cumulative_lengths):
+            self._cumulative_lengths = array('d')
+        elif number_of_curves > 0:
+            removed_length = cumulative_lengths[number_of_curves - 1]
+            self._cumulative_lengths = array('d', [length - removed_length
+                                                   for length in cumulative_lengths[number_of_curves:]])
 
     def _get_curve_t(self, t):
-        lengths = [curve.length() for curve in self._curves]
-        t_position = t * sum(lengths)
+        cumulative_lengths = self._cumulative_length_index()
+        t_position = t * cumulative_lengths[-1]
+
+        # Find the first curve which ends after t_position. Past the end of the chain, use the last curve.
+        i = min(bisect_right(cumulative_lengths, t_position), len(cumulative_lengths) - 1)
 
-        position = 0
-        for i, length in enumerate(lengths):
-            position += length
-            if position > t_position:
-                break
+        start_position = cumulative_lengths[i - 1] if i > 0 else 0
+        end_position = cumulative_lengths[i]
 
-        curve_t = formulas.inv_linear_map(position - length, position, t_position)
+        curve_t = formulas.inv_linear_map(start_position, end_position, t_position) \
+            if end_position > start_position else 0
 
-        return self._curves[i], curve_t
+        return self.get(i), curve_t
 
     def point(self, t):
         if self.chain_size() == 0:
@@ -93,6 +133,29 @@ class Chain(Curve):
         curve, curve_t = self._get_curve_t(t)
         return curve.point(curve_t)
 
+    def points(self, ts):
+        if self.chain_size() == 0:
+            raise ValueError("Chain.points was called before adding any curves to the chain.")
+
+        # Evaluate consecutive values of t which fall on the same curve in a single batch
+        coordinates = array('d')
+        batch_curve, batch_ts = None, []
+
+        for t in ts:
+            curve, curve_t = self._get_curve_t(t)
+
+            if curve is not batch_curve and batch_ts:
+                coordinates.extend(batch_curve.points(batch_ts))
+                batch_ts = []
+
+            batch_curve = curve
+            batch_ts.append(curve_t)
+
+        if batch_ts:
+            coordinates.extend(batch_curve.points(batch_ts))
+
+        return coordinates
+
     def derivative(self, t):
         if self.chain_size() == 0:
             raise ValueError("Chain.derivative was called before adding any curves to the chain.")
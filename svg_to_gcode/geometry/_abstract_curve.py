@@ -1,3 +1,7 @@
+import math
+from array import array
+from bisect import bisect_right
+
 from svg_to_gcode import formulas
 from svg_to_gcode.geometry import Vector
 
@@ -14,7 +18,10 @@ class Curve:
     :type self.end: Vector
     """
 
-    __slots__ = 'start', 'end'
+    __slots__ = 'start', 'end', '_length', '_arc_length_table'
+
+    # Number of intervals used for arc-length quadrature and for the inverse (length -> t) lookup table
+    arc_length_intervals = 16
 
     def point(self, t: float) -> Vector:
         """
@@ -26,6 +33,100 @@ class Curve:
         """
         raise NotImplementedError("point(self, t) must be implemented")
 
+    def speed(self, t: float) -> float:
+        """
+        The speed method returns the magnitude of the curve's derivative with respect to t. It's used to compute arc
+        lengths, so curves which don't override length() must implement it.
+
+        :param t: t is a number between 0 and 1.
+        :return: |dp/dt| at self.point(t)
+        """
+        raise NotImplementedError("speed(self, t) must be implemented")
+
+    def length(self) -> float:
+        """
+        Return the geometric length of the curve, computed with Gauss-Legendre quadrature of self.speed(). The result is
+        cached, curves must therefore not be modified after their length has been requested.
+        """
+        try:
+            return self._length
+        except AttributeError:
+            self._length = self._arc_length_index()[-1]
+            return self._length
+
+    def _arc_length_index(self) -> array:
+        """
+        Return a cached table of cumulative arc lengths, where entry i is the length of the curve from t=0 to
+        t=(i+1)/arc_length_intervals.
+        """
+        try:
+            return self._arc_length_table
+        except AttributeError:
+            intervals = self.arc_length_intervals
+            table = array('d')
+
+            total = 0
+            for i in range(intervals):
+                total += formulas.gauss_legendre_integral(self.speed, i / intervals, (i + 1) / intervals)
+                table.append(total)
+
+            self._arc_length_table = table
+            return table
+
+    def t_at_length(self, length: float) -> float:
+        """
+        The inverse of arc length. Return the value of t at which the curve, measured from its start, reaches a given
+        length. Uses the cached arc-length table and refines the interpolated value with Newton's method.
+
+        :param length: a number between 0 and self.length()
+        :return: t, a number between 0 and 1.
+        """
+        table = self._arc_length_index()
+        intervals = len(table)
+
+        if length <= 0:
+            return 0
+
+        if length >= table[-1]:
+            return 1
+
+        i = bisect_right(table, length)
+        interval_start = table[i - 1] if i > 0 else 0
+        t_start = i / intervals
+
+        t = formulas.linear_map(t_start, (i + 1) / intervals,
+                                formulas.inv_linear_map(interval_start, table[i], length))
+
+        for _ in range(2):
+            speed = self.speed(t)
+            if speed <= 0:
+                break
+
+            t -= (interval_start + formulas.gauss_legendre_integral(self.speed, t_start, t) - length) / speed
+
+        return min(1, max(0, t))
+
+    def points(self, ts) -> array:
+        """
+        The points method evaluates many points along the curve at once. Child classes should override it with an
+        implementation which avoids creating a Vector for every point.
+
+        :param ts: a sequence of numbers between 0 and 1.
+        :return: a coordinate array of doubles [x0, y0, x1, y1, ...] containing self.point(t) for every t in ts.
+        """
+        return array('d', [coordinate for t in ts for coordinate in self.point(t)])
+
+    def flatten(self, tolerance: float) -> array:
+        """
+        Optional method, if implemented approximates the curve with a polyline in a single pass.
+
+        :param tolerance: the maximum acceptable deviation from the curve.
+        :return: a coordinate array of doubles [x0, y0, x1, y1, ...] containing the vertices of a polyline which is
+        guaranteed to stay within tolerance of the curve. If not implemented return None, in which case
+        LineSegmentChain.line_segment_approximation() falls back on a generic (slower) algorithm.
+        """
+        return None
+
     def derivative(self, t):
         """
         The derivative method returns a derivative at a point along the curve.
@@ -62,13 +163,10 @@ class Curve:
         :return: the approximate maximum distance
         """
 
-        maximum_distance = 0
-        for i in range(samples):
-            t = (i + 1) / (samples + 1)
-            t1 = formulas.linear_map(t_range1[0], t_range1[1], t)
-            t2 = formulas.linear_map(t_range2[0], t_range2[1], t)
-
-            distance = abs(curve1.point(t1) - curve2.point(t2))
-            maximum_distance = distance if distance > maximum_distance else maximum_distance
+        ts = [(i + 1) / (samples + 1) for i in range(samples)]
+        points1 = curve1.points([formulas.linear_map(t_range1[0], t_range1[1], t) for t in ts])
+        points2 = curve2.points([formulas.linear_map(t_range2[0], t_range2[1], t) for t in ts])
 
-        return maximum_distance
+        return max(map(math.hypot,
+                       [x1 - x2 for x1, x2 in zip(points1[0::2], points2[0::2])],
+                       [y1 - y2 for y1, y2 in zip(points1[1::2], points2[1::2])]), default=0)
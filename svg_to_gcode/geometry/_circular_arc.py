@@ -1,4 +1,5 @@
 import math
+from array import array
 
 from svg_to_gcode.geometry import Vector
 from svg_to_gcode.geometry import Curve
@@ -27,6 +28,9 @@ class CircularArc(Curve):
     def length(self):
         return abs(self.start_angle - self.end_angle) * self.radius
 
+    def speed(self, t):
+        return self.length()
+
     def angle_to_point(self, rad):
         at_origin = self.radius * Vector(math.cos(rad), math.sin(rad))
         translated = at_origin + self.center
@@ -40,6 +44,26 @@ class CircularArc(Curve):
         angle = formulas.linear_map(self.start_angle, self.end_angle, t)
         return self.angle_to_point(angle)
 
+    def points(self, ts):
+        cx, cy, radius = self.center.x, self.center.y, self.radius
+        start_angle, sweep_angle = self.start_angle, self.end_angle - self.start_angle
+
+        return array('d', [coordinate for t in ts for coordinate in (
+            cx + radius * math.cos(start_angle + t * sweep_angle), cy + radius * math.sin(start_angle + t * sweep_angle))])
+
+    def flatten(self, tolerance):
+        """
+        Approximate the arc with evenly spaced angles. A chord spanning an angle h deviates from the arc by
+        radius * (1 - cos(h/2)), so the required step is computed directly rather than searched for.
+        """
+        if tolerance >= self.radius:
+            segments = 1
+        else:
+            step = 2 * math.acos(1 - tolerance / self.radius)
+            segments = max(1, math.ceil(abs(self.end_angle - self.start_angle) / step))
+
+        return self.points([i / segments for i in range(segments + 1)])
+
     def derivative(self, t):
         position = self.point(t)
         return (self.center.x - position.x) / (position.y - self.center.y)
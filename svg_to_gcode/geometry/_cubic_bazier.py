@@ -1,5 +1,9 @@
+import math
+from array import array
+
 from svg_to_gcode.geometry import Vector
 from svg_to_gcode.geometry import Curve
+from svg_to_gcode import formulas
 
 
 class CubicBazier(Curve):
@@ -23,10 +27,60 @@ class CubicBazier(Curve):
                3 * (1-t) * t**2 * self.control2 +\
                t**3 * self.end
 
+    def points(self, ts):
+        # Expand the bernstein form into power form once: p(t) = ((a*t + b)*t + c)*t + d
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = self.start, self.control1, self.control2, self.end
+        ax, ay = x3 - 3 * x2 + 3 * x1 - x0, y3 - 3 * y2 + 3 * y1 - y0
+        bx, by = 3 * x2 - 6 * x1 + 3 * x0, 3 * y2 - 6 * y1 + 3 * y0
+        cx, cy = 3 * (x1 - x0), 3 * (y1 - y0)
+
+        return array('d', [coordinate for t in ts
+                           for coordinate in (((ax * t + bx) * t + cx) * t + x0, ((ay * t + by) * t + cy) * t + y0)])
+
+    def flatten(self, tolerance, max_depth=24):
+        """
+        Approximate the bazier with a polyline using adaptive de Casteljau subdivision. A bazier lies within the convex
+        hull of its control points, so once both control points are within tolerance of the chord, so is the curve.
+        """
+        (x0, y0), (x3, y3) = self.start, self.end
+        coordinates = array('d', (x0, y0))
+
+        stack = [(x0, y0, *self.control1, *self.control2, x3, y3, 0)]
+        while stack:
+            x0, y0, x1, y1, x2, y2, x3, y3, depth = stack.pop()
+
+            if depth >= max_depth or (formulas.segment_distance(x1, y1, x0, y0, x3, y3) <= tolerance and
+                                      formulas.segment_distance(x2, y2, x0, y0, x3, y3) <= tolerance):
+                coordinates.extend((x3, y3))
+                continue
+
+            # Split at t=0.5. The second half is pushed first so that the first half is processed first.
+            x01, y01 = (x0 + x1) / 2, (y0 + y1) / 2
+            x12, y12 = (x1 + x2) / 2, (y1 + y2) / 2
+            x23, y23 = (x2 + x3) / 2, (y2 + y3) / 2
+            x012, y012 = (x01 + x12) / 2, (y01 + y12) / 2
+            x123, y123 = (x12 + x23) / 2, (y12 + y23) / 2
+            xm, ym = (x012 + x123) / 2, (y012 + y123) / 2
+
+            stack.append((xm, ym, x123, y123, x23, y23, x3, y3, depth + 1))
+            stack.append((x0, y0, x01, y01, x012, y012, xm, ym, depth + 1))
+
+        return coordinates
+
     def derivative(self, t):
         return 3 * (1-t)**2 * (self.control1 - self.start) +\
                6 * (1-t) * t * (self.control2 - self.control1) +\
                3 * t**2 * (self.end - self.control2)
 
+    def speed(self, t):
+        # |derivative(t)| without creating intermediate Vectors
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = self.start, self.control1, self.control2, self.end
+        u = 1 - t
+
+        dx = 3 * u * u * (x1 - x0) + 6 * u * t * (x2 - x1) + 3 * t * t * (x3 - x2)
+        dy = 3 * u * u * (y1 - y0) + 6 * u * t * (y2 - y1) + 3 * t * t * (y3 - y2)
+
+        return math.hypot(dx, dy)
+
     def sanity_check(self):
         pass
@@ -0,0 +1,153 @@
+import math
+
+from svg_to_gcode.geometry import LineSegmentChain
+from svg_to_gcode import TOLERANCES
+from svg_to_gcode import formulas
+
+
+class DuplicateFilter:
+    """
+    The DuplicateFilter class removes strokes which retrace strokes that were already drawn. Eg. a path duplicated in
+    the svg, or a fill outline which coincides with a stroke.
+
+    Chains are filtered in the order they are given, so the first occurrence of a stroke is always the one kept:
+        - Chains which are identical to a previous chain (drawn in either direction and, for closed chains, starting at
+        any vertex) are dropped entirely.
+        - Segments which lie within tolerance of a single segment of a previous chain are dropped, splitting their chain
+        where they are.
+
+    :param self.removed_chains: the number of chains dropped for being identical to a previous chain.
+    :param self.removed_segments: the number of segments dropped for overlapping a previous chain.
+    """
+
+    __slots__ = 'tolerance', 'cell_size', 'removed_chains', 'removed_segments', '_keys', '_cells'
+
+    def __init__(self, tolerance=None, cell_size=1.0):
+        """
+        :param tolerance: the distance under which strokes are considered to coincide. Defaults to the approximation
+        tolerance, which is the precision of line segment approximations.
+        :param cell_size: the size of the cells of the spatial hash used to look up segments. Best chosen close to the
+        typical segment length. Never smaller than twice the tolerance.
+        """
+        self.tolerance = TOLERANCES['approximation'] if tolerance is None else tolerance
+
+        if self.tolerance <= 0:
+            raise ValueError(f"tolerance must be a positive number. Not {self.tolerance}")
+
+        self.cell_size = max(cell_size, 2 * self.tolerance)
+
+        self.removed_chains = 0
+        self.removed_segments = 0
+
+        self._keys = set()
+        # Spatial hash of the kept segments, as (x1, y1, x2, y2) tuples
+        self._cells = {}
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def _chain_key(self, line_chain: LineSegmentChain) -> tuple:
+        """
+        Return a key which is the same for all chains drawing the same polyline, regardless of their direction and,
+        for closed chains, of their starting vertex.
+        """
+        vertices = [(round(x / self.tolerance), round(y / self.tolerance)) for x, y in line_chain.vertices()]
+
+        if not line_chain.is_closed():
+            return min(tuple(vertices), tuple(reversed(vertices)))
+
+        # Rotate the loop to start at its smallest vertex
+        loop = vertices[:-1]
+        smallest = min(loop)
+        candidates = []
+
+        for i, vertex in enumerate(loop):
+            if vertex == smallest:
+                rotation = loop[i:] + loop[:i]
+                candidates.append(tuple(rotation))
+                candidates.append(tuple(rotation[:1] + rotation[:0:-1]))
+
+        return (True,) + min(candidates)
+
+    def _is_covered(self, x1, y1, x2, y2) -> bool:
+        """Check whether a segment lies within tolerance of a single kept segment."""
+        tolerance = self.tolerance
+
+        for kept in self._cells.get(self._cell(x1, y1), ()):
+            kept_x1, kept_y1, kept_x2, kept_y2 = kept
+
+            # Cheap bounding box rejection before measuring distances
+            if max(x1, x2) < min(kept_x1, kept_x2) - tolerance or min(x1, x2) > max(kept_x1, kept_x2) + tolerance or \
+                    max(y1, y2) < min(kept_y1, kept_y2) - tolerance or min(y1, y2) > max(kept_y1, kept_y2) + tolerance:
+                continue
+
+            if formulas.segment_distance(x1, y1, *kept) <= tolerance and \
+                    formulas.segment_distance(x2, y2, *kept) <= tolerance:
+                return True
+
+        return False
+
+    def _add_segment(self, x1, y1, x2, y2):
+        segment = (x1, y1, x2, y2)
+        tolerance = self.tolerance
+
+        # Split the segment in pieces no longer than a cell, and register it in every cell the bounding box of a piece
+        # (grown by the tolerance) touches. Any point within tolerance of the segment then lies in a registered cell.
+        pieces = max(1, math.ceil(math.hypot(x2 - x1, y2 - y1) / self.cell_size))
+        cells = set()
+
+        for i in range(pieces):
+            start_x, start_y = x1 + (x2 - x1) * i / pieces, y1 + (y2 - y1) * i / pieces
+            end_x, end_y = x1 + (x2 - x1) * (i + 1) / pieces, y1 + (y2 - y1) * (i + 1) / pieces
+
+            first_column, first_row = self._cell(min(start_x, end_x) - tolerance, min(start_y, end_y) - tolerance)
+            last_column, last_row = self._cell(max(start_x, end_x) + tolerance, max(start_y, end_y) + tolerance)
+
+            cells.update((column, row) for column in range(first_column, last_column + 1)
+                         for row in range(first_row, last_row + 1))
+
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(segment)
+
+    def filter(self, line_chains):
+        """
+        Yield the parts of the given line chains which don't retrace previously filtered chains. Chains are consumed
+        lazily, so this can be used on a stream of chains.
+        """
+        for line_chain in line_chains:
+            if line_chain.chain_size() == 0:
+                continue
+
+            key = self._chain_key(line_chain)
+            if key in self._keys:
+                self.removed_chains += 1
+                continue
+
+            self._keys.add(key)
+
+            kept_segments = []
+            piece = LineSegmentChain()
+            vertices = list(line_chain.vertices())
+
+            for (x1, y1), (x2, y2) in zip(vertices, vertices[1:]):
+                if self._is_covered(x1, y1, x2, y2):
+                    self.removed_segments += 1
+
+                    if piece.chain_size() > 0:
+                        yield piece
+                        piece = LineSegmentChain()
+
+                    continue
+
+                if piece.chain_size() == 0:
+                    piece.append_vertex(x1, y1)
+
+                piece.append_vertex(x2, y2)
+                kept_segments.append((x1, y1, x2, y2))
+
+            if piece.chain_size() > 0:
+                yield piece
+
+            # Only register the chain once it's been checked, a chain never overlaps itself
+            for segment in kept_segments:
+                self._add_segment(*segment)
@@ -1,14 +1,15 @@
 import math
+from array import array
 
 from svg_to_gcode import formulas
-from svg_to_gcode.geometry import Vector, RotationMatrix
+from svg_to_gcode.geometry import Vector
 from svg_to_gcode.geometry import Curve
 
 
 class EllipticalArc(Curve):
     """The EllipticalArc class inherits from the abstract Curve class and describes an elliptical arc."""
 
-    __slots__ = 'center', 'radii', 'rotation', 'start_angle', 'sweep_angle', 'end_angle', 'transformation'
+    __slots__ = 'center', 'radii', 'rotation', 'start_angle', 'sweep_angle', 'end_angle', 'transformation', '_affine'
 
     # ToDo apply transformation beforehand (in Path) for consistency with other geometric objects. If you (the reader)
     #  know how to easily apply an affine transformation to an ellipse feel free to make a pull request.
@@ -24,6 +25,7 @@ class EllipticalArc(Curve):
         self.transformation = transformation
 
         # Calculate missing data
+        self._affine = self._affine_map()
         self.end_angle = start_angle + sweep_angle
         self.start = self.angle_to_point(self.start_angle)
         self.end = self.angle_to_point(self.end_angle)
@@ -34,18 +36,60 @@ class EllipticalArc(Curve):
         return f"EllipticalArc(start: {self.start}, end: {self.end}, center: {self.center}, radii: {self.radii}," \
                f" rotation: {self.rotation}, start_angle: {self.start_angle}, sweep_angle: {self.sweep_angle})"
 
+    def _affine_map(self):
+        """
+        Fold the radii, the rotation, the center and the transformation into a single affine map (a, b, c, d, e, f),
+        such that the point at angle θ is (a*cos(θ) + c*sin(θ) + e, b*cos(θ) + d*sin(θ) + f).
+        """
+        cos_rotation, sin_rotation = math.cos(self.rotation), math.sin(self.rotation)
+        a, b = cos_rotation * self.radii.x, sin_rotation * self.radii.x
+        c, d = -sin_rotation * self.radii.y, cos_rotation * self.radii.y
+        e, f = self.center.x, self.center.y
+
+        if self.transformation:
+            t = self.transformation
+            a, b, c, d, e, f = (t.a * a + t.c * b, t.b * a + t.d * b,
+                                t.a * c + t.c * d, t.b * c + t.d * d,
+                                t.a * e + t.c * f + t.e, t.b * e + t.d * f + t.f)
+
+        return a, b, c, d, e, f
+
     def point(self, t):
         angle = formulas.linear_map(self.start_angle, self.end_angle, t)
         return self.angle_to_point(angle)
 
     def angle_to_point(self, angle):
-        transformed_radii = Vector(self.radii.x * math.cos(angle), self.radii.y * math.sin(angle))
-        point = RotationMatrix(self.rotation) * transformed_radii + self.center
+        a, b, c, d, e, f = self._affine
+        cos_angle, sin_angle = math.cos(angle), math.sin(angle)
 
-        if self.transformation:
-            point = self.transformation.apply_affine_transformation(point)
+        return Vector(a * cos_angle + c * sin_angle + e, b * cos_angle + d * sin_angle + f)
+
+    def points(self, ts):
+        a, b, c, d, e, f = self._affine
+        start_angle, sweep_angle = self.start_angle, self.sweep_angle
+
+        coordinates = array('d')
+        for t in ts:
+            cos_angle, sin_angle = math.cos(start_angle + t * sweep_angle), math.sin(start_angle + t * sweep_angle)
+            coordinates.extend((a * cos_angle + c * sin_angle + e, b * cos_angle + d * sin_angle + f))
 
-        return point
+        return coordinates
+
+    def flatten(self, tolerance):
+        """
+        Approximate the arc with evenly spaced angles. The deviation of a chord spanning an angle h is at most
+        h^2/8 * max|p''|, and |p''| never exceeds the largest semi-axis of the transformed ellipse. So the required
+        step is computed directly rather than searched for.
+        """
+        a, b, c, d, _, _ = self._affine
+
+        # The largest singular value of the linear part is the transformed ellipse's largest semi-axis
+        largest_radius = formulas.largest_singular_value(a, b, c, d)
+
+        step = math.sqrt(8 * tolerance / largest_radius) if largest_radius > 0 else math.inf
+        segments = max(1, math.ceil(abs(self.sweep_angle) / step))
+
+        return self.points([i / segments for i in range(segments + 1)])
 
     def derivative(self, t):
         angle = formulas.linear_map(self.start_angle, self.end_angle, t)
@@ -54,5 +98,12 @@ class EllipticalArc(Curve):
     def angle_to_derivative(self, rad):
         return -(self.radii.y / self.radii.x) * math.tan(rad)**-1
 
+    def speed(self, t):
+        a, b, c, d, _, _ = self._affine
+        angle = self.start_angle + t * self.sweep_angle
+        cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+
+        return abs(self.sweep_angle) * math.hypot(c * cos_angle - a * sin_angle, d * cos_angle - b * sin_angle)
+
     def sanity_check(self):
         pass
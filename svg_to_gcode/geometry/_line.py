@@ -1,3 +1,5 @@
+from array import array
+
 from svg_to_gcode.geometry import Vector
 from svg_to_gcode.geometry import Curve
 from svg_to_gcode import formulas
@@ -22,11 +24,21 @@ class Line(Curve):
     def length(self):
         return abs(self.start - self.end)
 
+    def speed(self, t):
+        return self.length()
+
     def point(self, t):
+        # Interpolate both coordinates, the slope/offset form can't describe vertical lines
         x = self.start.x + t * (self.end.x - self.start.x)
-        y = self.slope * x + self.offset
+        y = self.start.y + t * (self.end.y - self.start.y)
 
         return Vector(x, y)
 
+    def points(self, ts):
+        x0, y0 = self.start.x, self.start.y
+        dx, dy = self.end.x - x0, self.end.y - y0
+
+        return array('d', [coordinate for t in ts for coordinate in (x0 + t * dx, y0 + t * dy)])
+
     def derivative(self, t):
         return self.slope
@@ -1,6 +1,10 @@
+import math
+from array import array
+
 from svg_to_gcode.geometry import Chain
 from svg_to_gcode.geometry import Curve, Line, Vector
 from svg_to_gcode import TOLERANCES
+from svg_to_gcode import formulas
 
 
 class LineSegmentChain(Chain):
@@ -10,23 +14,214 @@ class LineSegmentChain(Chain):
 
     LineSegmentChains can be instantiated either conventionally or through the static method line_segment_approximation(),
     which approximates any Curve with a series of line-segments contained in a new LineSegmentChain instance.
+
+    Rather than storing Line objects, the chain stores its vertices in a contiguous coordinate array of doubles
+    [x0, y0, x1, y1, ...]. Lines are only created on demand, by get() and __iter__. Prefer vertices() and
+    append_vertex() in performance sensitive code.
     """
+
+    __slots__ = '_coordinates'
+
+    def __init__(self, curves=None):
+        self._coordinates = array('d')
+        super().__init__(curves)
+
+    @classmethod
+    def from_coordinates(cls, coordinates) -> "LineSegmentChain":
+        """Instantiate a chain from a sequence of coordinates [x0, y0, x1, y1, ...] describing its vertices."""
+        if len(coordinates) % 2 or len(coordinates) == 2:
+            raise ValueError(f"A chain needs an even number of coordinates describing at least two vertices. "
+                             f"Not {len(coordinates)}")
+
+        chain = cls()
+        chain._coordinates = array('d', coordinates)
+
+        return chain
+
     def __repr__(self):
-        return f"{type(self)}({len(self._curves)} curves: {[line.__repr__() for line in self._curves[:2]]}...)"
+        return f"{type(self)}({self.chain_size()} curves: {[line.__repr__() for line in list(self)[:2]]}...)"
+
+    def __iter__(self):
+        coordinates = self._coordinates
+        for i in range(0, len(coordinates) - 2, 2):
+            yield Line(Vector(coordinates[i], coordinates[i + 1]), Vector(coordinates[i + 2], coordinates[i + 3]))
+
+    @property
+    def coordinates(self) -> memoryview:
+        """
+        A read-only, zero-copy view of the chain's coordinates [x0, y0, x1, y1, ...]. The view must be released before
+        the chain is modified.
+        """
+        return memoryview(self._coordinates).toreadonly()
+
+    def vertices(self):
+        """Iterate over the chain's vertices as (x, y) tuples without copying the coordinate array."""
+        iterator = iter(self._coordinates)
+        return zip(iterator, iterator)
+
+    def vertex(self, index: int) -> tuple:
+        """Return the vertex at a given index as an (x, y) tuple. Negative indices count from the last vertex."""
+        if index < 0:
+            index += len(self._coordinates) // 2
+
+        return self._coordinates[2 * index], self._coordinates[2 * index + 1]
+
+    def vertex_count(self) -> int:
+        """Return the number of vertices in the chain."""
+        return len(self._coordinates) // 2
+
+    def chain_size(self):
+        return max(0, len(self._coordinates) // 2 - 1)
+
+    def get(self, index: int) -> Line:
+        size = self.chain_size()
+        if not -size <= index < size:
+            raise IndexError("chain index out of range")
+
+        i = 2 * (index % size)
+        coordinates = self._coordinates
+        return Line(Vector(coordinates[i], coordinates[i + 1]), Vector(coordinates[i + 2], coordinates[i + 3]))
+
+    def _assert_continuity(self, x, y):
+        last_x, last_y = self._coordinates[-2], self._coordinates[-1]
+
+        if math.hypot(x - last_x, y - last_y) > TOLERANCES['input']:
+            raise ValueError(f"The end of the last line is different from the start of the new line"
+                             f"|{Vector(last_x, last_y)} - {Vector(x, y)}| >= {TOLERANCES['input']}")
 
     def append(self, line2: Line):
-        if self._curves:
-            line1 = self._curves[-1]
+        if self._coordinates:
+            # Assert continuity. The new line is joined to the end of the last one.
+            self._assert_continuity(line2.start.x, line2.start.y)
+        else:
+            self._coordinates.extend((line2.start.x, line2.start.y))
+
+        self._coordinates.extend((line2.end.x, line2.end.y))
+
+    def append_vertex(self, x: float, y: float):
+        """Append a line from the last vertex to (x, y). The first call sets the start of the chain."""
+        self._coordinates.append(x)
+        self._coordinates.append(y)
+
+    def extend(self, new_curves):
+        if not isinstance(new_curves, LineSegmentChain):
+            super().extend(new_curves)
+            return
+
+        if not new_curves._coordinates:
+            return
+
+        if self._coordinates:
+            self._assert_continuity(*new_curves.vertex(0))
+            self._coordinates.extend(new_curves._coordinates[2:])
+        else:
+            self._coordinates.extend(new_curves._coordinates)
+
+    def merge(self, chain: "LineSegmentChain"):
+        self.extend(chain)
+
+    def remove_from_first(self, number_of_curves: int):
+        if number_of_curves >= self.chain_size():
+            del self._coordinates[:]
+        else:
+            del self._coordinates[:2 * number_of_curves]
 
-            # Assert continuity
-            if abs(line1.end - line2.start) > TOLERANCES['input']:
-                raise ValueError(f"The end of the last line is different from the start of the new line"
-                                 f"|{line1.end} - {line2.start}| >= {TOLERANCES['input']}")
+        self._shift_cumulative_lengths(number_of_curves)
 
-            # Join lines
-            line2.start = line1.end
+    def remove_from_last(self, number_of_curves: int):
+        if number_of_curves >= self.chain_size():
+            del self._coordinates[:]
+        elif number_of_curves > 0:
+            del self._coordinates[-2 * number_of_curves:]
 
-        self._curves.append(line2)
+        del self._cumulative_lengths[self.chain_size():]
+
+    def _curve_lengths(self, first_index: int):
+        coordinates = self._coordinates
+        for i in range(2 * first_index, len(coordinates) - 2, 2):
+            yield math.hypot(coordinates[i + 2] - coordinates[i], coordinates[i + 3] - coordinates[i + 1])
+
+    def is_closed(self) -> bool:
+        """Check whether the chain ends where it starts."""
+        if self.chain_size() == 0:
+            return False
+
+        (start_x, start_y), (end_x, end_y) = self.vertex(0), self.vertex(-1)
+        return math.hypot(end_x - start_x, end_y - start_y) <= TOLERANCES['input']
+
+    def bounding_box(self) -> tuple:
+        """Return the smallest axis-aligned box containing the chain, as (min_x, min_y, max_x, max_y)."""
+        if not self._coordinates:
+            raise ValueError("An empty chain has no bounding box.")
+
+        x_coordinates, y_coordinates = self._coordinates[0::2], self._coordinates[1::2]
+        return min(x_coordinates), min(y_coordinates), max(x_coordinates), max(y_coordinates)
+
+    def clipped(self, min_x, min_y, max_x, max_y) -> ["LineSegmentChain"]:
+        """
+        Return the parts of the chain which lie inside a rectangle, as a list of chains. The chain is split wherever it
+        leaves the rectangle and a new chain starts wherever it re-enters it. Bounds may be infinite.
+        """
+        if self.chain_size() == 0:
+            return []
+
+        # Most chains are either entirely inside or entirely outside. Settle those without clipping every segment.
+        box_min_x, box_min_y, box_max_x, box_max_y = self.bounding_box()
+
+        if min_x <= box_min_x and box_max_x <= max_x and min_y <= box_min_y and box_max_y <= max_y:
+            return [self]
+
+        if box_max_x < min_x or max_x < box_min_x or box_max_y < min_y or max_y < box_min_y:
+            return []
+
+        pieces = []
+        piece = None
+        coordinates = self._coordinates
+
+        for i in range(0, len(coordinates) - 2, 2):
+            x1, y1, x2, y2 = coordinates[i:i + 4]
+
+            if min_x <= x1 <= max_x and min_y <= y1 <= max_y and min_x <= x2 <= max_x and min_y <= y2 <= max_y:
+                t_range = (0.0, 1.0)
+            else:
+                t_range = formulas.clip_segment(x1, y1, x2, y2, min_x, min_y, max_x, max_y)
+
+            # Segments which only touch the rectangle would leave a dot
+            if t_range is None or t_range[0] == t_range[1]:
+                piece = None
+                continue
+
+            t0, t1 = t_range
+
+            if t0 > 0 or piece is None:
+                piece = LineSegmentChain()
+                pieces.append(piece)
+                piece.append_vertex(x1 + (x2 - x1) * t0, y1 + (y2 - y1) * t0)
+
+            piece.append_vertex(x1 + (x2 - x1) * t1, y1 + (y2 - y1) * t1)
+
+            if t1 < 1:
+                piece = None
+
+        return pieces
+
+    def reversed_chain(self) -> "LineSegmentChain":
+        """Return a new chain which draws the same lines in the opposite direction."""
+        coordinates = self._coordinates
+        reversed_coordinates = array('d', coordinates)
+        reversed_coordinates[0::2] = coordinates[-2::-2]
+        reversed_coordinates[1::2] = coordinates[-1::-2]
+
+        return LineSegmentChain.from_coordinates(reversed_coordinates)
+
+    def rotated_chain(self, index: int) -> "LineSegmentChain":
+        """Return a new chain which draws the same closed loop, but starts at the vertex at a given index."""
+        if not self.is_closed():
+            raise ValueError("Only closed chains can be rotated.")
+
+        # The last vertex duplicates the first one. Drop it and close the loop on the new start instead.
+        coordinates = self._coordinates
+        return LineSegmentChain.from_coordinates(coordinates[2 * index:-2] + coordinates[:2 * index + 2])
 
     @staticmethod
     def line_segment_approximation(shape, increment_growth=11 / 10, error_cap=None, error_floor=None)\
@@ -50,12 +245,21 @@ class LineSegmentChain(Chain):
         if increment_growth <= 1:
             raise ValueError(f"increment_growth must be > 1. Not {increment_growth}")
 
+        # Chains of line segments are their own approximation
+        if isinstance(shape, LineSegmentChain):
+            return shape
+
         lines = LineSegmentChain()
 
         if isinstance(shape, Line):
             lines.append(shape)
             return lines
 
+        # Use the curve's dedicated single-pass flattener if it has one
+        coordinates = shape.flatten(error_cap)
+        if coordinates is not None:
+            return LineSegmentChain.from_coordinates(coordinates)
+
         t = 0
         line_start = shape.start
         increment = 5
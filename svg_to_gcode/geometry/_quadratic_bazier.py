@@ -1,5 +1,9 @@
+import math
+from array import array
+
 from svg_to_gcode.geometry import Vector
 from svg_to_gcode.geometry import Curve
+from svg_to_gcode import formulas
 
 
 class QuadraticBezier(Curve):
@@ -21,9 +25,50 @@ class QuadraticBezier(Curve):
     def point(self, t):
         return self.control + ((1 - t)**2) * (self.start - self.control) + (t**2) * (self.end - self.control)
 
+    def points(self, ts):
+        # Expand the bernstein form into power form once: p(t) = (a*t + b)*t + c
+        (x0, y0), (x1, y1), (x2, y2) = self.start, self.control, self.end
+        ax, ay = x0 - 2 * x1 + x2, y0 - 2 * y1 + y2
+        bx, by = 2 * (x1 - x0), 2 * (y1 - y0)
+
+        return array('d', [coordinate for t in ts for coordinate in ((ax * t + bx) * t + x0, (ay * t + by) * t + y0)])
+
+    def flatten(self, tolerance, max_depth=24):
+        """
+        Approximate the bezier with a polyline using adaptive de Casteljau subdivision. A bezier lies within the convex
+        hull of its control points, so once the control point is within tolerance of the chord, so is the curve.
+        """
+        (x0, y0), (x2, y2) = self.start, self.end
+        coordinates = array('d', (x0, y0))
+
+        stack = [(x0, y0, *self.control, x2, y2, 0)]
+        while stack:
+            x0, y0, x1, y1, x2, y2, depth = stack.pop()
+
+            if depth >= max_depth or formulas.segment_distance(x1, y1, x0, y0, x2, y2) <= tolerance:
+                coordinates.extend((x2, y2))
+                continue
+
+            # Split at t=0.5. The second half is pushed first so that the first half is processed first.
+            x01, y01 = (x0 + x1) / 2, (y0 + y1) / 2
+            x12, y12 = (x1 + x2) / 2, (y1 + y2) / 2
+            xm, ym = (x01 + x12) / 2, (y01 + y12) / 2
+
+            stack.append((xm, ym, x12, y12, x2, y2, depth + 1))
+            stack.append((x0, y0, x01, y01, xm, ym, depth + 1))
+
+        return coordinates
+
     def derivative(self, t):
         return 2 * (1 - t) * (self.control - self.start) + 2 * t * (self.end - self.control)
 
+    def speed(self, t):
+        # |derivative(t)| without creating intermediate Vectors
+        (x0, y0), (x1, y1), (x2, y2) = self.start, self.control, self.end
+        u = 1 - t
+
+        return math.hypot(2 * u * (x1 - x0) + 2 * t * (x2 - x1), 2 * u * (y1 - y0) + 2 * t * (y2 - y1))
+
     def sanity_check(self):
         # ToDo verify if self.start == self.end forms a valid curve under the svg standard
         pass
@@ -0,0 +1,280 @@
+import math
+from heapq import heappush, heappop, heappushpop
+
+from svg_to_gcode.geometry import LineSegmentChain
+
+
+class _PackedTree:
+    """
+    A static bounding volume hierarchy over boxes, built by recursively splitting the boxes at the median of their
+    centers along the widest axis. Its nodes adapt to the density of the boxes, so queries stay logarithmic however
+    unevenly the boxes are spread. Boxes can be removed, which empties the nodes they belong to.
+
+    Every box has an owner (eg. the chain it belongs to), which is what queries return.
+    """
+
+    __slots__ = 'entries', 'boxes', 'owners', 'removed', 'node_boxes', 'node_children', 'node_ranges', \
+                'node_parents', 'live', 'leaves', 'owner_entries'
+
+    def __init__(self, boxes: list, owners: list, leaf_size=8):
+        """
+        :param boxes: (min_x, min_y, max_x, max_y) tuples.
+        :param owners: the owner of each box.
+        :param leaf_size: the maximum number of boxes per leaf.
+
+        :param self.entries: the index, in the given lists, of the box at each position of the tree order.
+        """
+        # Entries are stored in tree order, so that each node covers a contiguous range of them
+        order = list(range(len(boxes)))
+
+        # Twice the center of each box, along either axis
+        centers = ([box[0] + box[2] for box in boxes], [box[1] + box[3] for box in boxes])
+
+        self.node_children = []
+        self.node_ranges = []
+        self.node_parents = []
+        self.live = []
+        self.leaves = [0] * len(boxes)
+
+        # Nodes are numbered in depth-first order, so children always come after their parent
+        stack = [(-1, 0, len(order))] if order else []
+        while stack:
+            parent, start, end = stack.pop()
+            node = len(self.node_ranges)
+
+            self.node_ranges.append((start, end))
+            self.node_parents.append(parent)
+            self.node_children.append(())
+            self.live.append(end - start)
+
+            if parent >= 0:
+                self.node_children[parent] += (node,)
+
+            if end - start <= leaf_size:
+                for position in range(start, end):
+                    self.leaves[position] = node
+                continue
+
+            # Split at the median center along the axis the centers spread the most
+            entries = order[start:end]
+            spreads = []
+            for axis_centers in centers:
+                values = [axis_centers[entry] for entry in entries]
+                spreads.append(max(values) - min(values))
+
+            entries.sort(key=centers[0 if spreads[0] >= spreads[1] else 1].__getitem__)
+            order[start:end] = entries
+
+            middle = (start + end) // 2
+            stack.append((node, middle, end))
+            stack.append((node, start, middle))
+
+        # Bound the leaves by their boxes, and every other node by its children
+        self.node_boxes = [None] * len(self.node_ranges)
+        for node in reversed(range(len(self.node_ranges))):
+            children = self.node_children[node]
+            node_boxes = [self.node_boxes[child] for child in children] if children else \
+                [boxes[entry] for entry in order[slice(*self.node_ranges[node])]]
+
+            self.node_boxes[node] = (min(box[0] for box in node_boxes), min(box[1] for box in node_boxes),
+                                     max(box[2] for box in node_boxes), max(box[3] for box in node_boxes))
+
+        self.entries = order
+        self.boxes = [boxes[entry] for entry in order]
+        self.owners = [owners[entry] for entry in order]
+        self.removed = bytearray(len(order))
+
+        self.owner_entries = {}
+        for position, owner in enumerate(self.owners):
+            self.owner_entries.setdefault(owner, []).append(position)
+
+    def remove(self, owner):
+        """Remove every box of an owner."""
+        for position in self.owner_entries.pop(owner, ()):
+            self.removed[position] = 1
+
+            node = self.leaves[position]
+            while node >= 0:
+                self.live[node] -= 1
+                node = self.node_parents[node]
+
+    def overlapping(self, min_x, min_y, max_x, max_y):
+        """Return the set of owners with a box overlapping the given box."""
+        owners = set()
+        stack = [0] if self.live and self.live[0] else []
+
+        while stack:
+            node = stack.pop()
+            box_min_x, box_min_y, box_max_x, box_max_y = self.node_boxes[node]
+
+            if box_min_x > max_x or min_x > box_max_x or box_min_y > max_y or min_y > box_max_y:
+                continue
+
+            children = self.node_children[node]
+            if children:
+                stack.extend(child for child in children if self.live[child])
+                continue
+
+            for position in range(*self.node_ranges[node]):
+                box_min_x, box_min_y, box_max_x, box_max_y = self.boxes[position]
+
+                if not self.removed[position] and box_min_x <= max_x and min_x <= box_max_x and \
+                        box_min_y <= max_y and min_y <= box_max_y:
+                    owners.add(self.owners[position])
+
+        return owners
+
+
+class SpatialIndex:
+    """
+    The SpatialIndex class answers proximity queries over a list of LineSegmentChains. It indexes the endpoints of every
+    chain (or every vertex of closed chains) and the bounding box of every chain in packed trees, which adapt to how the
+    chains are spread: a dense motif surrounded by a few distant strokes is as fast to query as evenly spread chains.
+    The index is built in bulk and supports removing chains, which makes it suitable for greedy passes such as
+    ordering.
+
+    Chains are referred to by their position in the list the index was built from.
+
+    :param self.x_period: if not None, distances along the x-axis wrap around every x_period units (eg. a rotational
+    axis). Only point queries take the period into account, bounding boxes are compared in plain coordinates.
+    """
+
+    __slots__ = 'chains', 'x_period', '_points', '_vertices', '_boxes', '_box_tree', '_removed', '_remaining'
+
+    def __init__(self, chains: [LineSegmentChain], x_period=None, index_closed_vertices=False, leaf_size=8):
+        """
+        :param chains: the chains to be indexed.
+        :param x_period: see self.x_period.
+        :param index_closed_vertices: whether to index every vertex of closed chains rather than only their endpoints.
+        Useful when a closed chain may be entered at any vertex.
+        :param leaf_size: the maximum number of points or boxes per leaf of the trees.
+        """
+        if leaf_size < 1:
+            raise ValueError(f"leaf_size must be a positive integer. Not {leaf_size}")
+
+        self.chains = chains
+        self.x_period = x_period
+        self._removed = bytearray(len(chains))
+        self._remaining = len(chains)
+
+        self._boxes = [chain.bounding_box() for chain in chains]
+
+        # Points are indexed as empty boxes owned by their chain. With a period, x is reduced to [0, x_period). The
+        # vertex index of each point is kept in self._vertices, in the order the points are given to the tree.
+        points, owners, self._vertices = [], [], []
+        for chain_index, chain in enumerate(chains):
+            if index_closed_vertices and chain.is_closed():
+                vertices = enumerate(chain.vertices())
+            else:
+                vertices = ((0, chain.vertex(0)), (chain.vertex_count() - 1, chain.vertex(-1)))
+
+            for vertex_index, (x, y) in vertices:
+                if x_period:
+                    x %= x_period
+
+                points.append((x, y, x, y))
+                owners.append(chain_index)
+                self._vertices.append(vertex_index)
+
+        self._points = _PackedTree(points, owners, leaf_size)
+
+        # The bounding box tree is only built by the first box query
+        self._box_tree = None
+
+    def __len__(self):
+        return self._remaining
+
+    def _distance(self, x1, y1, x2, y2):
+        dx = abs(x2 - x1)
+
+        if self.x_period:
+            dx %= self.x_period
+            dx = min(dx, self.x_period - dx)
+
+        return math.hypot(dx, y2 - y1)
+
+    def _box_distance(self, x, y, box):
+        """The distance from a point to the nearest point of a box, a lower bound for the distance to its content."""
+        min_x, min_y, max_x, max_y = box
+
+        if min_x <= x <= max_x:
+            dx = 0
+        elif self.x_period:
+            # The box lies within [0, x_period), it can be reached from either side
+            dx = min((min_x - x) % self.x_period, (x - max_x) % self.x_period)
+        else:
+            dx = min_x - x if x < min_x else x - max_x
+
+        dy = min_y - y if y < min_y else y - max_y if y > max_y else 0
+
+        return math.hypot(dx, dy)
+
+    def k_nearest(self, x, y, k):
+        """
+        Return the k indexed points nearest to (x, y) as a list of (distance, chain index, vertex index) tuples sorted by
+        distance. Vertex indices are 0 for the start of a chain and chain.vertex_count() - 1 for its end.
+        """
+        tree = self._points
+        if k <= 0 or self._remaining == 0:
+            return []
+
+        query_x = x % self.x_period if self.x_period else x
+
+        # Visit nodes nearest first. nearest holds the k best candidates as negated tuples, ie. a max-heap.
+        nodes = [(0, 0)]
+        nearest = []
+
+        while nodes:
+            node_distance, node = heappop(nodes)
+
+            # Candidates at the same distance as the k-th are kept, so that ties are broken by index
+            if len(nearest) == k and node_distance > -nearest[0][0]:
+                break
+
+            children = tree.node_children[node]
+            if children:
+                for child in children:
+                    if tree.live[child]:
+                        heappush(nodes, (self._box_distance(query_x, y, tree.node_boxes[child]), child))
+                continue
+
+            for position in range(*tree.node_ranges[node]):
+                if tree.removed[position]:
+                    continue
+
+                point_x, point_y = tree.boxes[position][:2]
+                chain_index, vertex_index = tree.owners[position], self._vertices[tree.entries[position]]
+                candidate = (-self._distance(query_x, y, point_x, point_y), -chain_index, -vertex_index)
+
+                if len(nearest) < k:
+                    heappush(nearest, candidate)
+                elif candidate > nearest[0]:
+                    heappushpop(nearest, candidate)
+
+        return sorted((-distance, -chain_index, -vertex_index) for distance, chain_index, vertex_index in nearest)
+
+    def nearest(self, x, y):
+        """
+        Return the indexed point nearest to (x, y) as a (distance, chain index, vertex index) tuple, or None if every
+        chain was removed.
+        """
+        nearest = self.k_nearest(x, y, 1)
+        return nearest[0] if nearest else None
+
+    def overlapping(self, min_x, min_y, max_x, max_y):
+        """Return the indices of the chains whose bounding box overlaps the given box, in ascending order."""
+        if self._box_tree is None:
+            live_chains = [chain_index for chain_index in range(len(self.chains)) if not self._removed[chain_index]]
+            self._box_tree = _PackedTree([self._boxes[chain_index] for chain_index in live_chains], live_chains)
+
+        return sorted(self._box_tree.overlapping(min_x, min_y, max_x, max_y))
+
+    def remove(self, chain_index: int):
+        """Remove a chain from the index. Removed chains are ignored by all subsequent queries."""
+        if not self._removed[chain_index]:
+            self._removed[chain_index] = 1
+            self._remaining -= 1
+
+            self._points.remove(chain_index)
+            if self._box_tree is not None:
+                self._box_tree.remove(chain_index)
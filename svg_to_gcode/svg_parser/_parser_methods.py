@@ -1,23 +1,514 @@
+import math
+import warnings
+from array import array
 from xml.etree import ElementTree
-from typing import List
-from copy import deepcopy
+from typing import List, Iterator
+from functools import lru_cache
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
 
-from svg_to_gcode.svg_parser import Path, Transformation
-from svg_to_gcode.geometry import Curve
+from svg_to_gcode.svg_parser import Path, Transformation, StyleResolver, parse_shape
+from svg_to_gcode.svg_parser._shapes import _drawing_transformation, _length
+from svg_to_gcode.geometry import Curve, LineSegmentChain
+from svg_to_gcode import TOLERANCES
+from svg_to_gcode import formulas
 
-NAMESPACES = {'svg': 'http://www.w3.org/2000/svg'}
+NAMESPACES = {'svg': 'http://www.w3.org/2000/svg', 'xlink': 'http://www.w3.org/1999/xlink'}
 
+# The total length of the path data sent to a worker process at once, when parsing in parallel
+_BATCH_LENGTH = 1 << 16
 
-def _has_style(element: ElementTree.Element, key: str, value: str) -> bool:
+
+@lru_cache(maxsize=1024)
+def _parse_transform(transform: str) -> Transformation:
+    """
+    Parse a transform attribute. Identical attributes are only parsed once, so the returned transformation is shared
+    and must never be modified.
+    """
+    transformation = Transformation()
+    transformation.add_transform(transform)
+
+    return transformation
+
+
+class _PathData:
+    """
+    Parses path data into untransformed segments. Identical path data is only parsed once per parse, and its segments
+    are shared between all the paths using it.
+
+    The cache is bounded by the total length of the path data it holds rather than by its number of entries, since a
+    single path can be megabytes long. The least recently used path data is evicted first.
+    """
+
+    __slots__ = "max_length", "_segments", "_length"
+
+    def __init__(self, max_length=1 << 20):
+        """
+        :param max_length: the maximum total length of the cached path data, in characters. Longer path data is parsed
+        every time.
+        """
+        self.max_length = max_length
+
+        self._segments = OrderedDict()
+        self._length = 0
+
+    def segments(self, d: str) -> tuple:
+        segments = self._segments.get(d)
+
+        if segments is not None:
+            self._segments.move_to_end(d)
+            return segments
+
+        segments = tuple(Path(d, 0, transform_origin=False).segments)
+
+        if len(d) <= self.max_length:
+            self._segments[d] = segments
+            self._length += len(d)
+
+            while self._length > self.max_length:
+                evicted, _ = self._segments.popitem(last=False)
+                self._length -= len(evicted)
+
+        return segments
+
+
+def _use_reference(element: ElementTree.Element) -> str:
+    """Return the raw reference of a <use> element, eg. "#id". Both href and the deprecated xlink:href are supported."""
+    return element.get("href") or element.get("{%s}href" % NAMESPACES["xlink"]) or ""
+
+
+def _canvas_height(root: ElementTree.Element) -> float:
+    """Read the canvas height from the height attribute of an svg root."""
+    height_str = root.get("height")
+    return float(height_str) if height_str.isnumeric() else float(height_str[:-2])
+
+
+def _viewport_size(root: ElementTree.Element):
     """
-    Check if an element contains a specific key and value either as an independent attribute or in the style attribute.
+    Return the size of a document's viewport in user units, which percentage lengths are relative to: the size of its
+    viewBox, or else its width and height. Returns None if it's unknown, eg. if the width is in millimeters.
+    """
+    try:
+        if root.get("viewBox"):
+            return _view_box(root.get("viewBox"))[2:]
+
+        width, height = _length(root, "width", None), _length(root, "height", None)
+    except ValueError:
+        return None
+
+    return None if width is None or height is None else (width, height)
+
+
+def _view_box(view_box: str) -> tuple:
+    """Parse a viewBox attribute into a (min_x, min_y, width, height) tuple."""
+    values = tuple(float(value) for value in view_box.replace(",", " ").split())
+
+    if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError(f"Expected a viewBox of 4 numbers with a positive width and height. Not {view_box!r}")
+
+    return values
+
+
+def _view_box_transformation(view_box: tuple, preserve_aspect_ratio: str, width: float, height: float)\
+        -> Transformation:
+    """
+    Return the transformation which fits a viewBox into a viewport of the given size, placed at the origin.
+
+    :param view_box: a (min_x, min_y, width, height) tuple, see _view_box.
+    :param preserve_aspect_ratio: the preserveAspectRatio attribute, eg. "xMidYMid meet" (the default) or "none".
+    """
+    min_x, min_y, view_box_width, view_box_height = view_box
+    scale_x, scale_y = width / view_box_width, height / view_box_height
+    translate_x = translate_y = 0
+
+    keywords = preserve_aspect_ratio.split()
+    if keywords and keywords[0] == "defer":
+        keywords = keywords[1:]
+
+    align = keywords[0] if keywords else "xMidYMid"
+    if align != "none":
+        fractions = {"Min": 0, "Mid": 0.5, "Max": 1}
+        if len(align) != 8 or align[0] != "x" or align[4] != "Y" or align[1:4] not in fractions or \
+                align[5:] not in fractions:
+            raise ValueError(f"Unknown preserveAspectRatio alignment {align!r}")
+
+        # meet fits the whole viewBox in the viewport, slice covers the whole viewport
+        scale_x = scale_y = max(scale_x, scale_y) if keywords[1:2] == ["slice"] else min(scale_x, scale_y)
+        translate_x = (width - view_box_width * scale_x) * fractions[align[1:4]]
+        translate_y = (height - view_box_height * scale_y) * fractions[align[5:]]
+
+    transformation = Transformation()
+    transformation.add_translation(translate_x, translate_y)
+    transformation.add_scale(scale_x, scale_y)
+    transformation.add_translation(-min_x, -min_y)
+
+    return transformation
+
+
+def _element_state(element: ElementTree.Element, visible_parent: bool, parent_transformation: Transformation,
+                   style_resolver: StyleResolver):
+    """
+    Work out the inherited state of an element from its parent's.
+
+    :return: None if the element and its children must be skipped altogether. Else a (visible, transformation) tuple.
+    """
+    style = style_resolver.style(element)
+
+    # display cannot be overridden by inheritance. Just skip the element
+    display = style.get("display") == "none"
+
+    # Definitions are only ever drawn through <use> elements
+    if display or element.tag in ("{%s}defs" % NAMESPACES["svg"], "{%s}symbol" % NAMESPACES["svg"]):
+        return None
+
+    # Transformations are never modified once created. Elements without a transform share their parent's.
+    transformation = parent_transformation
+
+    transform = element.get('transform')
+    if transform:
+        local_transformation = _parse_transform(transform)
+        transformation = local_transformation if transformation is None \
+            else transformation.combined(local_transformation)
+
+    # Is the element and it's root not hidden? visibility is inherited unless the element overrides it
+    visibility = style.get("visibility")
+    visible = visible_parent if visibility not in ("visible", "hidden", "collapse") else visibility == "visible"
+
+    return visible, transformation
+
+
+def _element_curves(element: ElementTree.Element, visible: bool, transformation: Transformation,
+                    canvas_height: float, transform_origin: bool, use_resolver: "_UseResolver",
+                    path_data: _PathData) -> List[Curve]:
+    """Parse a single element into geometric curves, ignoring its children."""
+    if element.tag == "{%s}path" % NAMESPACES["svg"]:
+        d = element.attrib['d']
+        return Path(d, canvas_height, transform_origin, transformation, segments=path_data.segments(d)).curves
+
+    if element.tag == "{%s}use" % NAMESPACES["svg"]:
+        return use_resolver.curves(element, visible, transformation, canvas_height, transform_origin)
+
+    # lxml trees, such as Inkscape's, give comments and processing instructions a non-string tag
+    if isinstance(element.tag, str) and element.tag.startswith("{%s}" % NAMESPACES["svg"]):
+        return parse_shape(element, canvas_height, transform_origin, transformation)
+
+    return []
+
+
+class _UseResolver:
+    """
+    Draws <use> elements. Each referenced element is parsed and approximated once, in its own coordinate system, and
+    the resulting polylines are transformed for every instance. Elements are only approximated again for instances
+    scaled enough to need a finer (or allow a coarser) approximation.
+
+    <use> elements nested in a referenced element are drawn at the scale of their own instance times the scale of the
+    instances they are nested in, so their approximations are fine enough once the outer instances are transformed.
+    """
+
+    __slots__ = "elements", "draw_hidden", "style_resolver", "path_data", "viewport", "_root", "_polylines", \
+                "_resolving", "_outer_scale"
+
+    def __init__(self, style_resolver: StyleResolver, path_data: _PathData, root: ElementTree.Element = None,
+                 draw_hidden=False):
+        """
+        :param style_resolver: the styles of the document.
+        :param path_data: the path data cache of the parse.
+        :param root: the document in which references are looked up. It's only indexed once a <use> element is met.
+        Alternatively, referable elements can be registered in self.elements by id.
+        :param draw_hidden: see parse_root.
+
+        :param self.viewport: the size of the document's viewport, see _viewport_size. It's read from root if
+        specified, otherwise it must be set before the first <use> element of a symbol with a viewBox is drawn.
+        """
+        self.elements = {}
+        self.draw_hidden = draw_hidden
+        self.style_resolver = style_resolver
+        self.path_data = path_data
+        self.viewport = None if root is None else _viewport_size(root)
+
+        self._root = root
+        self._polylines = {}
+        self._resolving = set()
+
+        # The scale the element being resolved is approximated for, 1 outside of any <use> element
+        self._outer_scale = 1
+
+    def _find(self, element_id: str):
+        if self._root is not None:
+            self.elements.update((element.get("id"), element) for element in self._root.iter() if element.get("id"))
+            self._root = None
+
+        return self.elements.get(element_id)
+
+    def _local_curves(self, element: ElementTree.Element, visible: bool) -> Iterator[Curve]:
+        """Parse a referenced element, and its children, in its own coordinate system."""
+        if element.tag == "{%s}symbol" % NAMESPACES["svg"]:
+            # The viewBox of a symbol is part of the instance transformation, see self.curves
+            yield from _iter_parse_children(element, False, 0, self.draw_hidden, visible, None, self.style_resolver,
+                                            self, self.path_data)
+            return
+
+        state = _element_state(element, visible, None, self.style_resolver)
+        if state is None:
+            return
+
+        visible, transformation = state
+
+        if self.draw_hidden or visible:
+            yield from _element_curves(element, visible, transformation, 0, False, self, self.path_data)
+
+        yield from _iter_parse_children(element, False, 0, self.draw_hidden, visible, transformation,
+                                        self.style_resolver, self, self.path_data)
+
+    def _viewport_length(self, element: ElementTree.Element, attribute: str, axis: int) -> float:
+        """Read the width or height of a <use> element. Percentages (100% by default) are relative to the viewport."""
+        value = element.get(attribute, "100%").strip()
+        if value == "auto":
+            value = "100%"
+
+        if not value.endswith("%"):
+            return _length(element, attribute)
+
+        if self.viewport is None:
+            raise ValueError(f"{attribute}={value!r} is relative to the size of the document, which is unknown")
+
+        return float(value[:-1]) / 100 * self.viewport[axis]
+
+    def curves(self, element: ElementTree.Element, visible: bool, transformation: Transformation,
+               canvas_height: float, transform_origin: bool) -> List[LineSegmentChain]:
+        """Return the curves drawn by a <use> element, as line segment chains. Takes the same parameters as Path."""
+        reference = _use_reference(element)
+        element_id = reference[1:] if reference.startswith("#") else None
+        referenced = self._find(element_id) if element_id else None
+
+        if referenced is None:
+            warnings.warn(f"Can't resolve the reference {reference!r} of a <use> element. Skipping it.")
+            return []
+
+        try:
+            x, y = _length(element, "x"), _length(element, "y")
+        except ValueError as value_error:
+            warnings.warn(f"Mis-formed input. Skipping the <use> element referencing {reference!r} because it caused "
+                          f"the following value error:\n{value_error}")
+            return []
+
+        instance_transformation = Transformation()
+        instance_transformation.add_translation(x, y)
+
+        # The viewBox of a symbol is fitted into the viewport set by the width and height of the <use> element
+        if referenced.tag == "{%s}symbol" % NAMESPACES["svg"] and referenced.get("viewBox"):
+            try:
+                view_box = _view_box(referenced.get("viewBox"))
+                width, height = self._viewport_length(element, "width", 0), self._viewport_length(element, "height", 1)
+                instance_transformation.extend(_view_box_transformation(
+                    view_box, referenced.get("preserveAspectRatio", ""), width, height))
+            except ValueError as value_error:
+                warnings.warn(f"Mis-formed input. Skipping the <use> element referencing {reference!r} because it "
+                              f"caused the following value error:\n{value_error}")
+                return []
+
+        if transformation is not None:
+            instance_transformation = transformation.combined(instance_transformation)
+
+        instance_transformation = _drawing_transformation(canvas_height, transform_origin, instance_transformation)
+
+        t = instance_transformation
+        scale = self._outer_scale * formulas.largest_singular_value(t.a, t.b, t.c, t.d)
+        if scale == 0:
+            return []
+
+        # Approximate finely enough for any scale up to the next power of two
+        scale_level = math.ceil(math.log2(scale))
+        key = (element_id, scale_level, visible)
+
+        polylines = self._polylines.get(key)
+        if polylines is None:
+            if element_id in self._resolving:
+                warnings.warn(f"<use> elements reference each other in a loop. Skipping the reference to {element_id}")
+                return []
+
+            tolerance = TOLERANCES["approximation"] / 2 ** scale_level
+
+            outer_scale = self._outer_scale
+            self._outer_scale = 2 ** scale_level
+
+            self._resolving.add(element_id)
+            try:
+                polylines = []
+
+                for curve in self._local_curves(referenced, visible):
+                    coordinates = LineSegmentChain.line_segment_approximation(curve, error_cap=tolerance).coordinates
+
+                    # Join continuous curves into a single polyline
+                    if polylines and polylines[-1][-2:] == array('d', coordinates[:2]):
+                        polylines[-1].extend(coordinates[2:])
+                    else:
+                        polylines.append(array('d', coordinates))
+            finally:
+                self._resolving.discard(element_id)
+                self._outer_scale = outer_scale
+
+            self._polylines[key] = polylines
+
+        return [LineSegmentChain.from_coordinates(instance_transformation.apply_affine_transformation_array(polyline))
+                for polyline in polylines]
+
+
+def _flatten_paths(paths: list, tolerance: float) -> List[array]:
+    """
+    Parse and approximate a batch of paths in a worker process. Only path data and coefficients are sent to workers,
+    and only coordinate arrays are sent back, which keeps the cost of crossing process boundaries low.
+
+    :param paths: a list of (d, coefficients) tuples, where coefficients are the six coefficients of the path's full
+    transformation, origin transformation included.
+    :param tolerance: the approximation tolerance, passed explicitly since workers don't share the parent's TOLERANCES.
+    :return: the coordinates of the approximations, with continuous approximations joined into a single array.
     """
-    return element.get(key) == value or (element.get("style") and f"{key}:{value}" in element.get("style"))
+    polylines = []
+    path_data = _PathData()
+
+    for d, coefficients in paths:
+        transformation = Transformation()
+        transformation.add_matrix(*coefficients)
+
+        path = Path(d, 0, transform_origin=False, transformation=transformation, segments=path_data.segments(d))
+
+        for curve in path.curves:
+            coordinates = LineSegmentChain.line_segment_approximation(curve, error_cap=tolerance).coordinates
+
+            if len(coordinates) < 4:
+                continue
+
+            if polylines and polylines[-1][-2:] == array('d', coordinates[:2]):
+                polylines[-1].extend(coordinates[2:])
+            else:
+                polylines.append(array('d', coordinates))
+
+    return polylines
+
+
+def _iter_curves(drawn_elements: Iterator[tuple], canvas_height: float, transform_origin: bool,
+                 use_resolver: _UseResolver, path_data: _PathData, processes: int = None) -> Iterator[Curve]:
+    """Parse the (element, visible, transformation) tuples of drawn elements into geometric curves."""
+    if processes is None:
+        for element, visible, transformation in drawn_elements:
+            yield from _element_curves(element, visible, transformation, canvas_height, transform_origin, use_resolver,
+                                       path_data)
+
+        return
+
+    tolerance = TOLERANCES["approximation"]
+    path_tag = "{%s}path" % NAMESPACES["svg"]
+
+    # Results in document order. Each is either the future of a batch sent to the workers or curves parsed locally.
+    pending = deque()
+    batch, batch_length = [], 0
+
+    with ProcessPoolExecutor(processes) as executor:
+        for element, visible, transformation in drawn_elements:
+            if element.tag == path_tag:
+                d = element.attrib['d']
+                t = _drawing_transformation(canvas_height, transform_origin, transformation)
+
+                batch.append((d, (t.a, t.b, t.c, t.d, t.e, t.f)))
+                batch_length += len(d)
+
+                if batch_length >= _BATCH_LENGTH:
+                    pending.append(executor.submit(_flatten_paths, batch, tolerance))
+                    batch, batch_length = [], 0
+            else:
+                # Other elements are cheap to parse, or like <use> elements rely on the parent's caches
+                curves = _element_curves(element, visible, transformation, canvas_height, transform_origin,
+                                         use_resolver, path_data)
+
+                if curves:
+                    if batch:
+                        pending.append(executor.submit(_flatten_paths, batch, tolerance))
+                        batch, batch_length = [], 0
+
+                    pending.append(curves)
+
+            # Yield whatever is ready, and wait for the workers once enough batches are in flight
+            while pending and (not isinstance(pending[0], Future) or pending[0].done()
+                               or len(pending) > 2 * processes):
+                yield from _pending_curves(pending.popleft())
+
+        if batch:
+            pending.append(executor.submit(_flatten_paths, batch, tolerance))
+
+        while pending:
+            yield from _pending_curves(pending.popleft())
+
+
+def _pending_curves(result) -> List[Curve]:
+    if isinstance(result, Future):
+        return [LineSegmentChain.from_coordinates(polyline) for polyline in result.result()]
+
+    return result
+
+
+def _iter_drawn_elements(root: ElementTree.Element, draw_hidden: bool, visible_root: bool,
+                         root_transformation: Transformation, style_resolver: StyleResolver) -> Iterator[tuple]:
+    """
+    Walk an etree root's descendants depth-first with an explicit stack, so deeply nested groups don't hit the
+    recursion limit. Yields an (element, visible, transformation) tuple for every element to be drawn.
+    """
+
+    # Each entry holds an element's remaining children along with the element's visibility and transformation
+    stack = [(iter(root), visible_root, root_transformation)]
+
+    while stack:
+        children, visible_parent, parent_transformation = stack[-1]
+
+        element = next(children, None)
+        if element is None:
+            stack.pop()
+            continue
+
+        state = _element_state(element, visible_parent, parent_transformation, style_resolver)
+        if state is None:
+            continue
+
+        visible, transformation = state
+
+        # If the current element is opaque and visible, draw it
+        if draw_hidden or visible:
+            yield element, visible, transformation
+
+        # Continue with the element's children
+        stack.append((iter(element), visible, transformation))
+
+
+def _iter_parse_children(root: ElementTree.Element, transform_origin: bool, canvas_height: float, draw_hidden: bool,
+                         visible_root: bool, root_transformation: Transformation, style_resolver: StyleResolver,
+                         use_resolver: _UseResolver, path_data: _PathData) -> Iterator[Curve]:
+    """The body of iter_parse_root, which <use> elements also rely on to parse the elements they reference."""
+    drawn_elements = _iter_drawn_elements(root, draw_hidden, visible_root, root_transformation, style_resolver)
+    yield from _iter_curves(drawn_elements, canvas_height, transform_origin, use_resolver, path_data)
 
 
 # Todo deal with viewBoxes
+def iter_parse_root(root: ElementTree.Element, transform_origin=True, canvas_height=None, draw_hidden=False,
+                    visible_root=True, root_transformation=None, processes=None) -> Iterator[Curve]:
+    """
+    Lazily parse an etree root's children into geometric curves. Curves are yielded as soon as their element is parsed,
+    so they can be compiled while the rest of the document is still being parsed. Takes the same parameters as
+    parse_root.
+    """
+
+    if canvas_height is None:
+        canvas_height = _canvas_height(root)
+
+    style_resolver = StyleResolver(root)
+    path_data = _PathData()
+    use_resolver = _UseResolver(style_resolver, path_data, root, draw_hidden)
+
+    drawn_elements = _iter_drawn_elements(root, draw_hidden, visible_root, root_transformation, style_resolver)
+    yield from _iter_curves(drawn_elements, canvas_height, transform_origin, use_resolver, path_data, processes)
+
+
 def parse_root(root: ElementTree.Element, transform_origin=True, canvas_height=None, draw_hidden=False,
-               visible_root=True, root_transformation=None) -> List[Curve]:
+               visible_root=True, root_transformation=None, processes=None) -> List[Curve]:
 
     """
     Recursively parse an etree root's children into geometric curves.
@@ -30,67 +521,177 @@ def parse_root(root: ElementTree.Element, transform_origin=True, canvas_height=N
     :param draw_hidden: Whether or not to draw hidden elements based on their display, visibility and opacity attributes.
     :param visible_root: Specifies whether or the root is visible. (Inheritance can be overridden)
     :param root_transformation: Specifies whether the root's transformation. (Transformations are inheritable)
+    :param processes: If specified, paths are parsed and approximated in parallel by this many worker processes. Their
+    curves are then returned as LineSegmentChains, approximated within TOLERANCES['approximation']. Worth it for large
+    documents only, starting the workers takes a while.
     :return: A list of geometric curves describing the svg. Use the Compiler sub-module to compile them to gcode.
     """
+    return list(iter_parse_root(root, transform_origin, canvas_height, draw_hidden, visible_root, root_transformation,
+                                processes))
 
-    if canvas_height is None:
-        height_str = root.get("height")
-        canvas_height = float(height_str) if height_str.isnumeric() else float(height_str[:-2])
 
-    curves = []
+def parse_string(svg_string: str, transform_origin=True, canvas_height=None, draw_hidden=False, processes=None)\
+        -> List[Curve]:
+    """
+        Recursively parse an svg string into geometric curves. (Wrapper for parse_root)
+
+        :param svg_string: The etree element who's children should be recursively parsed. The root will not be drawn.
+        :param canvas_height: The height of the canvas. By default the height attribute of the root is used. If the root
+        does not contain the height attribute, it must be either manually specified or transform_origin must be False.
+        :param transform_origin: Whether or not to transform input coordinates from the svg coordinate system to standard cartesian
+         system. Depends on canvas_height for calculations.
+        :param draw_hidden: Whether or not to draw hidden elements based on their display, visibility and opacity attributes.
+        :param processes: The number of worker processes, see parse_root.
+        :return: A list of geometric curves describing the svg. Use the Compiler sub-module to compile them to gcode.
+    """
+    root = ElementTree.fromstring(svg_string)
+    return parse_root(root, transform_origin, canvas_height, draw_hidden, processes=processes)
 
-    # Draw visible elements (Depth-first search)
-    for element in list(root):
 
-        # display cannot be overridden by inheritance. Just skip the element
-        display = _has_style(element, "display", "none")
+def _scan_file(file_path: str):
+    """
+    Read an svg file once, without keeping it, to find what streaming it requires.
 
-        if display or element.tag == "{%s}defs" % NAMESPACES["svg"]:
-            continue
+    :return: a (referenced, streamable) tuple. referenced is the set of ids referenced by <use> elements, which must be
+    kept while streaming. streamable is False if a <use> element references an element which isn't complete yet, or a
+    <style> sheet follows elements it may apply to. Those can only be resolved by parsing the whole document.
+    """
+    use_tag = "{%s}use" % NAMESPACES["svg"]
+    style_tag = "{%s}style" % NAMESPACES["svg"]
+    # Svg elements which are never drawn, so a <style> sheet following them doesn't matter
+    unstyled_tags = {"{%s}%s" % (NAMESPACES["svg"], tag) for tag in ("defs", "style", "metadata", "title", "desc")}
 
-        transformation = deepcopy(root_transformation) if root_transformation else None
+    referenced, complete = set(), set()
+    streamable = True
+    styled = False  # Whether an svg element a <style> sheet could apply to was met
 
-        transform = element.get('transform')
-        if transform:
-            transformation = Transformation() if transformation is None else transformation
-            transformation.add_transform(transform)
+    stack = []
 
-        # Is the element and it's root not hidden?
-        visible = visible_root and not (_has_style(element, "visibility", "hidden")
-                                        or _has_style(element, "visibility", "collapse"))
-        # Override inherited visibility
-        visible = visible or (_has_style(element, "visibility", "visible"))
+    with open(file_path, "rb") as svg_file:
+        for event, element in ElementTree.iterparse(svg_file, events=("start", "end")):
+            if event == "start":
+                if stack and element.tag.startswith("{%s}" % NAMESPACES["svg"]) and element.tag not in unstyled_tags:
+                    styled = True
 
-        # If the current element is opaque and visible, draw it
-        if draw_hidden or visible:
-            if element.tag == "{%s}path" % NAMESPACES["svg"]:
-                path = Path(element.attrib['d'], canvas_height, transform_origin, transformation)
-                curves.extend(path.curves)
+                if element.tag == use_tag:
+                    reference = _use_reference(element)
+
+                    if reference.startswith("#"):
+                        referenced.add(reference[1:])
+                        streamable = streamable and reference[1:] in complete
+
+                if element.tag == style_tag and styled:
+                    streamable = False
+
+                stack.append(element)
+                continue
 
-        # Continue the recursion
-        curves.extend(parse_root(element, transform_origin, canvas_height, draw_hidden, visible, transformation))
+            stack.pop()
+            if element.get("id"):
+                complete.add(element.get("id"))
 
-    # ToDo implement shapes class
-    return curves
+            if stack:
+                element.clear()
+                del stack[-1][:]
 
+    return referenced, streamable
 
-def parse_string(svg_string: str, transform_origin=True, canvas_height=None, draw_hidden=False) -> List[Curve]:
+
+def _iter_file_elements(file_path: str, draw_hidden: bool, style_resolver: StyleResolver,
+                        use_resolver: _UseResolver, referenced: set) -> Iterator[tuple]:
     """
-        Recursively parse an svg string into geometric curves. (Wrapper for parse_root)
+    Stream an svg file. Yields an (element, visible, transformation) tuple for every element to be drawn, preceded by
+    the root element on its own. Elements are discarded once the next tuple is requested, except for definitions and
+    the elements whose id is in referenced, which are kept for <use> elements.
+    """
+    style_tag = "{%s}style" % NAMESPACES["svg"]
+    definition_tags = ("{%s}defs" % NAMESPACES["svg"], "{%s}symbol" % NAMESPACES["svg"])
 
-        :param svg_string: The etree element who's children should be recursively parsed. The root will not be drawn.
-        :param canvas_height: The height of the canvas. By default the height attribute of the root is used. If the root
-        does not contain the height attribute, it must be either manually specified or transform_origin must be False.
-        :param transform_origin: Whether or not to transform input coordinates from the svg coordinate system to standard cartesian
-         system. Depends on canvas_height for calculations.
-        :param draw_hidden: Whether or not to draw hidden elements based on their display, visibility and opacity attributes.
-        :return: A list of geometric curves describing the svg. Use the Compiler sub-module to compile them to gcode.
+    # Each entry holds an open element, its (visible, transformation) state or None if it's skipped, and whether it's
+    # kept, ie. part of a definition or of a referenced element
+    stack = []
+
+    # Open the file here rather than in iterparse, so that it is closed even if the parse stops before its end
+    with open(file_path, "rb") as svg_file:
+        for event, element in ElementTree.iterparse(svg_file, events=("start", "end")):
+            if event == "start":
+                if not stack:
+                    # The root is never drawn
+                    yield element
+
+                    stack.append((element, (True, None), False))
+                    continue
+
+                _, parent_state, parent_kept = stack[-1]
+                state = None if parent_state is None else _element_state(element, *parent_state, style_resolver)
+                kept = parent_kept or element.tag in definition_tags or element.get("id") in referenced
+                stack.append((element, state, kept))
+                continue
+
+            _, state, kept = stack.pop()
+            if not stack:
+                break
+
+            if element.tag == style_tag:
+                style_resolver.add_stylesheet(element.text or "")
+
+            if state is not None:
+                visible, transformation = state
+
+                if draw_hidden or visible:
+                    yield element, visible, transformation
+
+            if kept:
+                if element.get("id"):
+                    use_resolver.elements[element.get("id")] = element
+
+                continue
+
+            # The element's parent is still open, but all of its previous children were discarded already
+            element.clear()
+            del stack[-1][0][:]
+
+
+def iter_parse_file(file_path: str, transform_origin=True, canvas_height=None, draw_hidden=False, processes=None)\
+        -> Iterator[Curve]:
     """
-    root = ElementTree.fromstring(svg_string)
-    return parse_root(root, transform_origin, canvas_height, draw_hidden)
+    Lazily parse an svg file into geometric curves. Takes the same parameters as parse_file.
+
+    The file is streamed rather than loaded as a whole. Elements are parsed as soon as they are complete and then
+    discarded, so memory use is proportional to the document's nesting depth rather than to its size. Only definitions
+    (the content of <defs> and <symbol> elements) and the elements referenced by <use> elements are kept.
+
+    The file is first read once to find the referenced elements. Documents which can't be streamed, because a <use>
+    element references an element which follows it or a <style> sheet follows elements it may apply to, are parsed as a
+    whole with iter_parse_root instead. Either way, the curves are the same as parse_root's.
+    """
+    referenced, streamable = _scan_file(file_path)
+
+    if not streamable:
+        yield from iter_parse_root(ElementTree.parse(file_path).getroot(), transform_origin, canvas_height, draw_hidden,
+                                   processes=processes)
+        return
+
+    style_resolver = StyleResolver()
+    path_data = _PathData()
+    use_resolver = _UseResolver(style_resolver, path_data, draw_hidden=draw_hidden)
+
+    drawn_elements = _iter_file_elements(file_path, draw_hidden, style_resolver, use_resolver, referenced)
+
+    root = next(drawn_elements, None)
+    if root is None:
+        return
+
+    use_resolver.viewport = _viewport_size(root)
+
+    if canvas_height is None:
+        canvas_height = _canvas_height(root)
+
+    yield from _iter_curves(drawn_elements, canvas_height, transform_origin, use_resolver, path_data, processes)
 
 
-def parse_file(file_path: str, transform_origin=True, canvas_height=None, draw_hidden=False) -> List[Curve]:
+def parse_file(file_path: str, transform_origin=True, canvas_height=None, draw_hidden=False, processes=None)\
+        -> List[Curve]:
     """
             Recursively parse an svg file into geometric curves. (Wrapper for parse_root)
 
@@ -100,7 +701,7 @@ def parse_file(file_path: str, transform_origin=True, canvas_height=None, draw_h
             :param transform_origin: Whether or not to transform input coordinates from the svg coordinate system to standard cartesian
              system. Depends on canvas_height for calculations.
             :param draw_hidden: Whether or not to draw hidden elements based on their display, visibility and opacity attributes.
+            :param processes: The number of worker processes, see parse_root.
             :return: A list of geometric curves describing the svg. Use the Compiler sub-module to compile them to gcode.
         """
-    root = ElementTree.parse(file_path).getroot()
-    return parse_root(root, transform_origin, canvas_height, draw_hidden)
+    return list(iter_parse_file(file_path, transform_origin, canvas_height, draw_hidden, processes))
@@ -1,3 +1,4 @@
+import re
 import math
 import warnings
 
@@ -10,24 +11,49 @@ from svg_to_gcode import formulas
 
 verbose = False
 
+# Tokens of svg path data. Numbers need no delimiter when the next one starts with a sign or a second decimal point.
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_FLAG = re.compile(r"[01]")
+_SEPARATORS = re.compile(r"[\s,]*")
+
 
 class Path:
-    """The Path class represents a generic svg path."""
+    """
+    The Path class represents a generic svg path.
+
+    Path data is first parsed into segments in the svg's own coordinate system. Segments are (kind, coordinates) tuples
+    where kind is one of 'L', 'C', 'Q' (whose coordinates are the x, y pairs of their points) or 'A' (whose coordinates
+    are center_x, center_y, rx, ry, rotation, start_angle, sweep_angle). Segments only depend on the path data, so they
+    can be shared between paths with identical data and different transformations.
+    """
 
     command_lengths = {'M': 2, 'm': 2, 'L': 2, 'l': 2, 'H': 1, 'h': 1, 'V': 1, 'v': 1, 'Z': 0, 'z': 0, 'C': 6, 'c': 6,
                        'Q': 4, 'q': 4, 'S': 4, 's': 4, 'T': 2, 't': 2, 'A': 7, 'a': 7}
 
-    __slots__ = "curves", "initial_point", "current_point", "last_control", "canvas_height", "draw_move", \
-                "transform_origin", "transformation"
+    # If a moveto is followed by multiple pairs of coordinates, the subsequent pairs are treated as implicit lineto
+    # commands. https://www.w3.org/TR/SVG2/paths.html#PathDataMovetoCommands
+    implicit_commands = {'M': 'L', 'm': 'l'}
 
-    def __init__(self, d: str, canvas_height: float, transform_origin=True, transformation=None):
+    __slots__ = "segments", "_curves", "initial_point", "current_point", "last_control", "last_command_key", \
+                "canvas_height", "draw_move", "transform_origin", "transformation"
+
+    def __init__(self, d: str, canvas_height: float, transform_origin=True, transformation=None, segments=None):
+        """
+        :param d: the path data.
+        :param canvas_height: the height of the canvas, used to transform the origin.
+        :param transform_origin: whether or not to transform input coordinates from the svg coordinate system to the
+        standard cartesian system.
+        :param transformation: the transformation inherited by the path, including its own transform attribute.
+        :param segments: the segments of d, if they were already parsed for another path. d is then ignored.
+        """
         self.canvas_height = canvas_height
         self.transform_origin = transform_origin
 
-        self.curves = []
+        self._curves = None
         self.initial_point = Vector(0, 0)  # type: Vector
         self.current_point = Vector(0, 0)
         self.last_control = None  # type: Vector
+        self.last_command_key = None  # The absolute key of the last command, used to reflect control points
 
         self.transformation = Transformation()
 
@@ -38,6 +64,12 @@ class Path:
         if transformation is not None:
             self.transformation.extend(transformation)
 
+        if segments is not None:
+            self.segments = segments
+            return
+
+        self.segments = []
+
         try:
             self._parse_commands(d)
         except Exception as generic_exception:
@@ -46,277 +78,258 @@ class Path:
     def __repr__(self):
         return f"Path({self.curves})"
 
+    @property
+    def curves(self) -> list:
+        """The path's geometric curves, built from its segments on first access."""
+        if self._curves is None:
+            self._curves = [self._segment_curve(kind, coordinates) for kind, coordinates in self.segments]
+
+        return self._curves
+
+    def _segment_curve(self, kind: str, coordinates: tuple):
+        """Apply the path's transformation to a segment, turning it into a geometric curve."""
+        if kind == 'A':
+            center_x, center_y, rx, ry, rotation, start_angle, sweep_angle = coordinates
+            return EllipticalArc(Vector(center_x, center_y), Vector(rx, ry), rotation, start_angle, sweep_angle,
+                                 transformation=self.transformation)
+
+        points = self._transform_points(*coordinates)
+
+        if kind == 'L':
+            return Line(*points)
+
+        if kind == 'C':
+            start, control1, control2, end = points
+            return CubicBazier(start, end, control1, control2)
+
+        start, control, end = points
+        return QuadraticBezier(start, end, control)
+
     def _parse_commands(self, d: str):
         """Parse svg commands (stored in value of the d key) into geometric curves."""
+        for command_key, command_arguments in self.tokenize(d):
+            self._add_svg_curve(command_key, command_arguments)
 
-        command_key = ''  # A character representing a specific command based on the svg standard
-        command_arguments = []  # A list containing the arguments for the current command_key
-
-        number_str = ''  # A buffer used to store numeric characters before conferring them to a number
-
-        # Parse each character in d
-        i = 0
-        while i < len(d):
-            character = d[i]
-
-            is_numeric = character.isnumeric() or character in ['-', '.', 'e']  # Yes, "-6.2e-4" is a valid float.
-            is_delimiter = character.isspace() or character in [',']
-            is_command_key = character in self.command_lengths.keys()
-            is_final = i == len(d) - 1
-
-            # If the current command is complete, however the next command does not specify a new key, assume the next
-            # command has the same key. This is implemented by inserting the current key before the next command and
-            # restarting the loop without incrementing i
-            try:
-                if command_key and len(command_arguments) == self.command_lengths[command_key] and is_numeric:
-                    duplicate = command_key
-                    # If a moveto is followed by multiple pairs of coordinates, the subsequent pairs are treated as
-                    # implicit lineto commands. https://www.w3.org/TR/SVG2/paths.html#PathDataMovetoCommands
-                    if command_key == 'm':
-                        duplicate = 'l'
-
-                    if command_key == 'M':
-                        duplicate = 'L'
-
-                    d = d[:i] + duplicate + d[i:]
-                    continue
-            except KeyError as key_error:
-                warnings.warn(f"Unknown command key {command_key}. Skipping curve.")
-
-            # If the character is part of a number, keep on composing it
-            if is_numeric:
-                number_str += character
-
-                # if a negative number follows another number, no delimiter is required.
-                # implicitly stated decimals like .6 don't require a delimiter. In either case we add a delimiter.
-                negatives = not is_final and character != 'e' and d[i + 1] == '-'
-                implicit_decimals = not is_final and d[i + 1] == '.' and '.' in number_str
-                if negatives or implicit_decimals:
-                    d = d[:i+1] + ',' + d[i+1:]
-
-            # If the character is a delimiter or a command key or the last character, complete the number and save it
-            # as an argument
-            if is_delimiter or is_command_key or is_final:
-                if number_str:
-                    # In svg form '-.5' can be written as '-.5'. Python doesn't like that notation.
-                    if number_str[0] == '.':
-                        number_str = '0' + number_str
-                    if number_str[0] == '-' and number_str[1] == '.':
-                        number_str = '-0' + number_str[1:]
-
-                    command_arguments.append(float(number_str))
-                    number_str = ''
-
-            # If it's a command key or the last character, parse the previous (now complete) command and save the letter
-            # as the new command key
-            if is_command_key or is_final:
-                if command_key:
-                    self._add_svg_curve(command_key, command_arguments)
-
-                command_key = character
-                command_arguments.clear()
-
-            # If the last character is a command key (only useful for Z), save
-            if is_command_key and is_final:
-                self._add_svg_curve(command_key, command_arguments)
-
-            i += 1
+    @classmethod
+    def tokenize(cls, d: str):
+        """
+        Split svg path data into commands in a single pass over d. Yields (command_key, command_arguments) tuples.
+        Implicitly repeated commands are yielded once per repetition, moveto repetitions are yielded as lineto commands.
+        https://www.w3.org/TR/SVG2/paths.html#PathDataBNF
 
-    def _add_svg_curve(self, command_key: str, command_arguments: List[float]):
+        A command followed by too few arguments is yielded as is. Any other mis-formed input raises a ValueError.
         """
-        Offer a representation of a curve using the geometry sub-module.
-        Based on Mozilla Docs: https://developer.mozilla.org/en-US/docs/Web/SVG/Tutorial/Paths
+        position = _SEPARATORS.match(d).end()
 
-        Each sub-method must be implemented with the following structure:
-        def descriptive_name(*command_arguments):
-            execute calculations and transformations, **do not modify or create any instance variables**
-            generate curve
-            modify instance variables
-            return curve
+        while position < len(d):
+            command_key = d[position]
 
-        Alternatively a sub-method may simply call a base command.
+            if command_key not in cls.command_lengths:
+                raise ValueError(f"Expected a command at position {position} of the path data. Found {command_key!r}")
 
-        :param command_key: a character representing a specific command based on the svg standard
-        :param command_arguments: A list containing the arguments for the current command_key
-        """
+            position = _SEPARATORS.match(d, position + 1).end()
+            command_length = cls.command_lengths[command_key]
 
-        # Establish a new initial point and a new current point. (multiple coordinates are parsed as lineto commands)
-        def absolute_move(x, y):
-            self.initial_point = Vector(x, y)
-            self.current_point = Vector(x, y)
-            return None
+            if command_length == 0:
+                yield command_key, []
+                continue
 
-        def relative_move(dx, dy):
-            return absolute_move(*(self.current_point + Vector(dx, dy)))
+            # Read groups of arguments for as long as the next token is a number
+            while True:
+                command_arguments = []
 
-        # Draw straight line
-        def absolute_line(x, y):
-            start = self.current_point
-            end = Vector(x, y)
+                for i in range(command_length):
+                    # Arc flags are single digits which may be written without delimiters. Eg. "a1 1 0 00.5.5"
+                    token = _FLAG if command_key in 'Aa' and i in (3, 4) else _NUMBER
+                    match = token.match(d, position)
+
+                    if match is None:
+                        break
 
-            line = Line(self.transformation.apply_affine_transformation(start),
-                        self.transformation.apply_affine_transformation(end))
+                    command_arguments.append(float(match.group()))
+                    position = _SEPARATORS.match(d, match.end()).end()
 
-            self.current_point = end
+                yield command_key, command_arguments
 
-            return line
+                if len(command_arguments) < command_length or not _NUMBER.match(d, position):
+                    break
 
-        def relative_line(dx, dy):
-            return absolute_line(*(self.current_point + Vector(dx, dy)))
+                command_key = cls.implicit_commands.get(command_key, command_key)
+
+    def _add_svg_curve(self, command_key: str, command_arguments: List[float]):
+        """
+        Offer a representation of a curve as a segment (see the class docstring).
+        Based on Mozilla Docs: https://developer.mozilla.org/en-US/docs/Web/SVG/Tutorial/Paths
 
-        def absolute_horizontal_line(x):
-            return absolute_line(x, self.current_point.y)
+        Relative commands are first converted to their absolute counterpart. Every absolute command is then handled by
+        the method listed in command_methods. Each method must be implemented with the following structure:
+        def _descriptive_name(self, *command_arguments):
+            execute calculations
+            generate segment
+            modify instance variables
+            return segment
 
-        def relative_horizontal_line(dx):
-            return absolute_horizontal_line(self.current_point.x + dx)
+        Alternatively a method may simply call another command's method.
 
-        def absolute_vertical_line(y):
-            return absolute_line(self.current_point.x, y)
+        :param command_key: a character representing a specific command based on the svg standard
+        :param command_arguments: A list containing the arguments for the current command_key
+        """
+        absolute_key, absolute_arguments = command_key, command_arguments
 
-        def relative_vertical_line(dy):
-            return absolute_vertical_line(self.current_point.y + dy)
+        try:
+            if command_key in self.relative_commands:
+                absolute_key, absolute_arguments = self._to_absolute(command_key, command_arguments)
 
-        def close_path():
-            return absolute_line(*self.initial_point)
+            segment = self.command_methods[absolute_key](self, *absolute_arguments)
+        except TypeError as type_error:
+            warnings.warn(f"Mis-formed input. Skipping command {command_key, command_arguments} because it caused the "
+                          f"following error: \n{type_error}")
+        except ValueError as value_error:
+            warnings.warn(f"Impossible geometry. Skipping curve {command_key, command_arguments} because it caused the "
+                          f"following value error:\n{value_error}")
+        else:
+            if segment is not None:
+                self.segments.append(segment)
 
-        # Draw curvy curves
-        def absolute_cubic_bazier(control1_x, control1_y, control2_x, control2_y, x, y):
+            self.last_command_key = absolute_key
 
-            trans_start = self.transformation.apply_affine_transformation(self.current_point)
-            trans_end = self.transformation.apply_affine_transformation(Vector(x, y))
-            trans_control1 = self.transformation.apply_affine_transformation(Vector(control1_x, control1_y))
-            trans_control2 = self.transformation.apply_affine_transformation(Vector(control2_x, control2_y))
+            if verbose:
+                print(f"{command_key}{tuple(command_arguments)} -> {segment}")
 
-            cubic_bezier = CubicBazier(trans_start, trans_end, trans_control1, trans_control2)
+    def _to_absolute(self, command_key: str, command_arguments: List[float]):
+        """Convert a relative command to the equivalent absolute command by offsetting all its coordinates at once."""
+        absolute_key, axes = self.relative_commands[command_key]
 
-            self.last_control = Vector(control2_x, control2_y)
-            self.current_point = Vector(x, y)
+        # Leave mis-formed arguments as they are, so that they are reported
+        if len(command_arguments) != len(axes):
+            return absolute_key, command_arguments
 
-            return cubic_bezier
+        origin = (self.current_point.x, self.current_point.y, 0)
+        return absolute_key, [argument + origin[axis] for argument, axis in zip(command_arguments, axes)]
 
-        def relative_cubic_bazier(dx1, dy1, dx2, dy2, dx, dy):
-            return absolute_cubic_bazier(self.current_point.x + dx1, self.current_point.y + dy1,
-                                         self.current_point.x + dx2, self.current_point.y + dy2,
-                                         self.current_point.x + dx, self.current_point.y + dy)
+    def _transform_points(self, *coordinates: float) -> List[Vector]:
+        """Apply the path's transformation to any number of points, given as x1, y1, x2, y2, ..."""
+        transformation = self.transformation
+        a, b, c, d, e, f = transformation.a, transformation.b, transformation.c, transformation.d, transformation.e, \
+            transformation.f
 
-        def absolute_cubic_bezier_extension(x2, y2, x, y):
-            start = self.current_point
-            control2 = Vector(x2, y2)
-            end = Vector(x, y)
+        return [Vector(a * x + c * y + e, b * x + d * y + f) for x, y in zip(coordinates[0::2], coordinates[1::2])]
 
-            if self.last_control:
-                control1 = 2 * start - self.last_control
-                bazier = absolute_cubic_bazier(*control1, *control2, *end)
-            else:
-                bazier = absolute_quadratic_bazier(*control2, *end)
+    # Establish a new initial point and a new current point. (multiple coordinates are parsed as lineto commands)
+    def _absolute_move(self, x, y):
+        self.initial_point = Vector(x, y)
+        self.current_point = Vector(x, y)
+        return None
 
-            self.current_point = start
+    # Draw straight line
+    def _absolute_line(self, x, y):
+        line = ('L', (self.current_point.x, self.current_point.y, x, y))
 
-            return bazier
+        self.current_point = Vector(x, y)
 
-        def relative_cubic_bazier_extension(dx2, dy2, dx, dy):
-            return absolute_cubic_bezier_extension(self.current_point.x + dx2, self.current_point.y + dy2,
-                                                   self.current_point.x + dx, self.current_point.y + dy)
+        return line
 
-        def absolute_quadratic_bazier(control1_x, control1_y, x, y):
+    def _absolute_horizontal_line(self, x):
+        return self._absolute_line(x, self.current_point.y)
 
-            trans_end = self.transformation.apply_affine_transformation(self.current_point)
-            trans_new_end = self.transformation.apply_affine_transformation(Vector(x, y))
-            trans_control1 = self.transformation.apply_affine_transformation(Vector(control1_x, control1_y))
+    def _absolute_vertical_line(self, y):
+        return self._absolute_line(self.current_point.x, y)
 
-            quadratic_bezier = QuadraticBezier(trans_end, trans_new_end, trans_control1)
+    def _close_path(self):
+        return self._absolute_line(*self.initial_point)
 
-            self.last_control = Vector(control1_x, control1_y)
-            self.current_point = Vector(x, y)
+    # Draw curvy curves
+    def _absolute_cubic_bazier(self, control1_x, control1_y, control2_x, control2_y, x, y):
+        cubic_bezier = ('C', (self.current_point.x, self.current_point.y, control1_x, control1_y, control2_x, control2_y,
+                              x, y))
 
-            return quadratic_bezier
+        self.last_control = Vector(control2_x, control2_y)
+        self.current_point = Vector(x, y)
 
-        def relative_quadratic_bazier(dx1, dy1, dx, dy):
-            return absolute_quadratic_bazier(self.current_point.x + dx1, self.current_point.y + dy1,
-                                             self.current_point.x + dx, self.current_point.y + dy)
+        return cubic_bezier
 
-        def absolute_quadratic_bazier_extension(x, y):
-            start = self.current_point
-            end = Vector(x, y)
+    def _absolute_cubic_bezier_extension(self, x2, y2, x, y):
+        start = self.current_point
 
-            if self.last_control:
-                control = 2 * start - self.last_control
-                bazier = absolute_quadratic_bazier(*control, *end)
-            else:
-                bazier = absolute_quadratic_bazier(*start, *end)
+        # The first control point reflects the previous cubic's second control point, if there is one
+        if self.last_command_key in ('C', 'S'):
+            control1 = 2 * start - self.last_control
+        else:
+            control1 = start
 
-            self.current_point = end
-            return bazier
+        return self._absolute_cubic_bazier(*control1, x2, y2, x, y)
 
-        def relative_quadratic_bazier_extension(dx, dy):
-            return absolute_quadratic_bazier_extension(self.current_point.x + dx, self.current_point.y + dy)
+    def _absolute_quadratic_bazier(self, control1_x, control1_y, x, y):
+        quadratic_bezier = ('Q', (self.current_point.x, self.current_point.y, control1_x, control1_y, x, y))
 
-        # Generate EllipticalArc with center notation from svg endpoint notation.
-        # Based on w3.org implementation notes. https://www.w3.org/TR/SVG2/implnote.html
-        # Todo transformations aren't applied correctly to elliptical arcs
-        def absolute_arc(rx, ry, deg_from_horizontal, large_arc_flag, sweep_flag, x, y):
-            end = Vector(x, y)
-            start = self.current_point
+        self.last_control = Vector(control1_x, control1_y)
+        self.current_point = Vector(x, y)
 
-            radii = Vector(rx, ry)
+        return quadratic_bezier
 
-            rotation_rad = math.radians(deg_from_horizontal)
+    def _absolute_quadratic_bazier_extension(self, x, y):
+        start = self.current_point
 
-            if abs(start-end) == 0:
-                raise ValueError("start and end points can't be equal")
+        # The control point reflects the previous quadratic's control point, if there is one
+        if self.last_command_key in ('Q', 'T'):
+            control = 2 * start - self.last_control
+        else:
+            control = start
 
-            radii, center, start_angle, sweep_angle = formulas.endpoint_to_center_parameterization(
-                start, end, radii, rotation_rad, large_arc_flag, sweep_flag)
+        return self._absolute_quadratic_bazier(*control, x, y)
 
-            arc = EllipticalArc(center, radii, rotation_rad, start_angle, sweep_angle, transformation=self.transformation)
+    # Generate EllipticalArc with center notation from svg endpoint notation.
+    # Based on w3.org implementation notes. https://www.w3.org/TR/SVG2/implnote.html
+    def _absolute_arc(self, rx, ry, deg_from_horizontal, large_arc_flag, sweep_flag, x, y):
+        end = Vector(x, y)
+        start = self.current_point
 
-            self.current_point = end
-            return arc
+        radii = Vector(rx, ry)
 
-        def relative_arc(rx, ry, deg_from_horizontal, large_arc_flag, sweep_flag, dx, dy):
-            return absolute_arc(rx, ry, deg_from_horizontal, large_arc_flag, sweep_flag, self.current_point.x + dx, self.current_point.y + dy)
+        rotation_rad = math.radians(deg_from_horizontal)
 
-        command_methods = {
-            # Only move end point
-            'M': absolute_move,
-            'm': relative_move,
+        if abs(start-end) == 0:
+            raise ValueError("start and end points can't be equal")
 
-            # Draw straight line
-            'L': absolute_line,
-            'l': relative_line,
-            'H': absolute_horizontal_line,
-            'h': relative_horizontal_line,
-            'V': absolute_vertical_line,
-            'v': relative_vertical_line,
-            'Z': close_path,
-            'z': close_path,
+        radii, center, start_angle, sweep_angle = formulas.endpoint_to_center_parameterization(
+            start, end, radii, rotation_rad, large_arc_flag, sweep_flag)
 
-            # Draw bazier curves
-            'C': absolute_cubic_bazier,
-            'c': relative_cubic_bazier,
-            'S': absolute_cubic_bezier_extension,
-            's': relative_cubic_bazier_extension,
-            'Q': absolute_quadratic_bazier,
-            'q': relative_quadratic_bazier,
-            'T': absolute_quadratic_bazier_extension,
-            't': relative_quadratic_bazier_extension,
+        arc = ('A', (center.x, center.y, radii.x, radii.y, rotation_rad, start_angle, sweep_angle))
 
-            # Draw elliptical arcs
-            'A': absolute_arc,
-            'a': relative_arc
-        }
+        self.current_point = end
+        return arc
 
-        try:
-            curve = command_methods[command_key](*command_arguments)
-        except TypeError as type_error:
-            warnings.warn(f"Mis-formed input. Skipping command {command_key, command_arguments} because it caused the "
-                          f"following error: \n{type_error}")
-        except ValueError as value_error:
-            warnings.warn(f"Impossible geometry. Skipping curve {command_key, command_arguments} because it caused the "
-                          f"following value error:\n{value_error}")
-        else:
-            if curve is not None:
-                self.curves.append(curve)
+    command_methods = {
+        # Only move end point
+        'M': _absolute_move,
 
-            if verbose:
-                print(f"{command_key}{tuple(command_arguments)} -> {curve}")
+        # Draw straight line
+        'L': _absolute_line,
+        'H': _absolute_horizontal_line,
+        'V': _absolute_vertical_line,
+        'Z': _close_path,
+
+        # Draw bazier curves
+        'C': _absolute_cubic_bazier,
+        'S': _absolute_cubic_bezier_extension,
+        'Q': _absolute_quadratic_bazier,
+        'T': _absolute_quadratic_bazier_extension,
+
+        # Draw elliptical arcs
+        'A': _absolute_arc
+    }
+
+    # The absolute counterpart of each relative command, and the axis each of its arguments lies on. 0 for x, 1 for y
+    # and 2 for arguments which aren't coordinates.
+    relative_commands = {
+        'm': ('M', (0, 1)),
+        'l': ('L', (0, 1)),
+        'h': ('H', (0,)),
+        'v': ('V', (1,)),
+        'z': ('Z', ()),
+        'c': ('C', (0, 1, 0, 1, 0, 1)),
+        's': ('S', (0, 1, 0, 1)),
+        'q': ('Q', (0, 1, 0, 1)),
+        't': ('T', (0, 1)),
+        'a': ('A', (2, 2, 2, 2, 2, 0, 1))
+    }
@@ -0,0 +1,173 @@
+import math
+import warnings
+from xml.etree import ElementTree
+
+from typing import List
+
+from svg_to_gcode.geometry import Vector, Curve
+from svg_to_gcode.geometry import Line, EllipticalArc, LineSegmentChain
+from svg_to_gcode.svg_parser import Transformation
+from svg_to_gcode.svg_parser._path import _NUMBER
+
+
+def _length(element: ElementTree.Element, attribute: str, default=0.0) -> float:
+    """Read a length attribute. Only user units (optionally suffixed by px) are supported."""
+    value = element.get(attribute)
+
+    if value is None or value.strip() == "auto":
+        return default
+
+    value = value.strip()
+    if value.endswith("px"):
+        value = value[:-2]
+
+    return float(value)
+
+
+def _drawing_transformation(canvas_height: float, transform_origin: bool, transformation: Transformation)\
+        -> Transformation:
+    """Combine an element's inherited transformation with the change of origin, like Path does."""
+    drawing_transformation = Transformation()
+
+    if transform_origin:
+        drawing_transformation.add_translation(0, canvas_height)
+        drawing_transformation.add_scale(1, -1)
+
+    if transformation is not None:
+        drawing_transformation.extend(transformation)
+
+    return drawing_transformation
+
+
+def _polyline(transformation: Transformation, coordinates: List[float]) -> List[Curve]:
+    """Straight lines are drawn exactly, so transform the vertices directly into a LineSegmentChain."""
+    return [LineSegmentChain.from_coordinates(transformation.apply_affine_transformation_array(coordinates))]
+
+
+def _arc(transformation, center_x, center_y, rx, ry, start_angle, sweep_angle) -> EllipticalArc:
+    return EllipticalArc(Vector(center_x, center_y), Vector(rx, ry), 0, start_angle, sweep_angle,
+                         transformation=transformation)
+
+
+def _parse_line(element, transformation):
+    coordinates = [_length(element, "x1"), _length(element, "y1"), _length(element, "x2"), _length(element, "y2")]
+    return _polyline(transformation, coordinates)
+
+
+def _parse_polyline(element, transformation, closed=False):
+    coordinates = [float(number) for number in _NUMBER.findall(element.get("points", ""))]
+
+    # Render up to the error, as required by the svg standard
+    if len(coordinates) % 2:
+        warnings.warn(f"Mis-formed input. Ignoring the odd coordinate at the end of points=\"{element.get('points')}\"")
+        coordinates.pop()
+
+    if len(coordinates) < 4:
+        return []
+
+    if closed:
+        coordinates.extend(coordinates[:2])
+
+    return _polyline(transformation, coordinates)
+
+
+def _parse_polygon(element, transformation):
+    return _parse_polyline(element, transformation, closed=True)
+
+
+def _parse_rect(element, transformation):
+    x, y = _length(element, "x"), _length(element, "y")
+    width, height = _length(element, "width"), _length(element, "height")
+
+    if width <= 0 or height <= 0:
+        return []
+
+    # A missing radius defaults to the other one. Both are clamped to half the rectangle's size.
+    rx, ry = _length(element, "rx", None), _length(element, "ry", None)
+    rx = ry if rx is None else rx
+    ry = rx if ry is None else ry
+    rx, ry = min(rx or 0, width / 2), min(ry or 0, height / 2)
+
+    if rx <= 0 or ry <= 0:
+        return _polyline(transformation, [x, y, x + width, y, x + width, y + height, x, y + height, x, y])
+
+    # Straight edges, each followed by a quarter arc turning the corner clockwise (in svg coordinates)
+    curves = []
+    corners = [
+        (x + width - rx, y, x + width - rx, y + ry, -math.pi / 2),
+        (x + width, y + height - ry, x + width - rx, y + height - ry, 0),
+        (x + rx, y + height, x + rx, y + height - ry, math.pi / 2),
+        (x, y + ry, x + rx, y + ry, math.pi)
+    ]
+    start = Vector(x + rx, y)
+
+    for end_x, end_y, center_x, center_y, start_angle in corners:
+        edge_start, edge_end = transformation.apply_affine_transformation(start), \
+            transformation.apply_affine_transformation(Vector(end_x, end_y))
+
+        if abs(edge_end - edge_start) > 0:
+            curves.append(Line(edge_start, edge_end))
+
+        curves.append(_arc(transformation, center_x, center_y, rx, ry, start_angle, math.pi / 2))
+
+        start = Vector(center_x + rx * math.cos(start_angle + math.pi / 2),
+                       center_y + ry * math.sin(start_angle + math.pi / 2))
+
+    return curves
+
+
+def _parse_circle(element, transformation):
+    r = _length(element, "r")
+
+    if r <= 0:
+        return []
+
+    return [_arc(transformation, _length(element, "cx"), _length(element, "cy"), r, r, 0, 2 * math.pi)]
+
+
+def _parse_ellipse(element, transformation):
+    rx, ry = _length(element, "rx", None), _length(element, "ry", None)
+    rx = ry if rx is None else rx
+    ry = rx if ry is None else ry
+
+    if rx is None or rx <= 0 or ry <= 0:
+        return []
+
+    return [_arc(transformation, _length(element, "cx"), _length(element, "cy"), rx, ry, 0, 2 * math.pi)]
+
+
+shape_methods = {
+    "line": _parse_line,
+    "polyline": _parse_polyline,
+    "polygon": _parse_polygon,
+    "rect": _parse_rect,
+    "circle": _parse_circle,
+    "ellipse": _parse_ellipse
+}
+
+
+def parse_shape(element: ElementTree.Element, canvas_height: float, transform_origin=True, transformation=None)\
+        -> List[Curve]:
+    """
+    Parse an svg basic shape (line, polyline, polygon, rect, circle or ellipse) into geometric curves. Straight shapes
+    are returned as LineSegmentChains, which need no approximation, and round shapes as exact elliptical arcs.
+    https://www.w3.org/TR/SVG2/shapes.html
+
+    :param element: the shape's element. Elements which aren't basic shapes yield no curves.
+    :param canvas_height: the height of the canvas, see Path.
+    :param transform_origin: whether or not to transform input coordinates from the svg coordinate system to standard
+    cartesian system.
+    :param transformation: the transformation inherited by the element, including its own transform attribute.
+    :return: A list of geometric curves describing the shape.
+    """
+    shape_method = shape_methods.get(element.tag.rpartition('}')[2])
+
+    if shape_method is None:
+        return []
+
+    try:
+        return shape_method(element, _drawing_transformation(canvas_height, transform_origin, transformation))
+    except ValueError as value_error:
+        warnings.warn(f"Mis-formed input. Skipping {element.tag} element because it caused the following value "
+                      f"error:\n{value_error}")
+        return []
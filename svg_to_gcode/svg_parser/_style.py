@@ -0,0 +1,109 @@
+import re
+from functools import lru_cache
+from xml.etree import ElementTree
+
+_COMMENTS = re.compile(r"/\*.*?\*/", re.DOTALL)
+_SIMPLE_SELECTOR = re.compile(r"[#.]?[\w-]+|\*")
+_SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+
+
+@lru_cache(maxsize=1024)
+def _parse_declarations(declarations: str) -> dict:
+    """
+    Parse css declarations (eg. a style attribute) into a dict of properties. Identical declarations are only parsed
+    once, so the returned dict is shared and must never be modified.
+    """
+    properties = {}
+
+    for declaration in declarations.split(';'):
+        key, colon, value = declaration.partition(':')
+
+        if colon:
+            properties[key.strip().lower()] = value.replace("!important", "").strip()
+
+    return properties
+
+
+class StyleResolver:
+    """
+    The StyleResolver class computes the style properties of svg elements. In order of increasing precedence, these come
+    from presentation attributes (eg. display="none"), from the rules of <style> sheets which select the element by tag,
+    class or id, and from the element's style attribute.
+
+    Only simple selectors (tag, *, .class and #id) are supported. Rules with any other selector are ignored.
+    """
+
+    __slots__ = "_rules", "_styles"
+
+    # The attributes which are read as style properties
+    presentation_attributes = ("display", "visibility")
+
+    def __init__(self, root: ElementTree.Element = None):
+        """
+        :param root: if specified, the rules of every <style> sheet in the document are added.
+        """
+        # Rules merged per selector, with the least specific selectors first
+        self._rules = {'tag': {}, 'class': {}, 'id': {}}
+
+        # Computed styles, shared by all elements with the same tag, class, id and style attributes
+        self._styles = {}
+
+        if root is not None:
+            for style in root.iter("{%s}style" % _SVG_NAMESPACE):
+                self.add_stylesheet(style.text or "")
+
+    def add_stylesheet(self, stylesheet: str):
+        """Add the rules of a css stylesheet. Later rules take precedence over earlier rules of the same selector."""
+        for rule in _COMMENTS.sub("", stylesheet).split('}'):
+            selectors, bracket, declarations = rule.partition('{')
+
+            if not bracket:
+                continue
+
+            properties = _parse_declarations(declarations)
+
+            for selector in selectors.split(','):
+                selector = selector.strip()
+
+                if not _SIMPLE_SELECTOR.fullmatch(selector):
+                    continue
+
+                kind, name = {'#': ('id', selector[1:]), '.': ('class', selector[1:])}.get(selector[0], ('tag', selector))
+                self._rules[kind].setdefault(name, {}).update(properties)
+
+        self._styles.clear()
+
+    def style(self, element: ElementTree.Element) -> dict:
+        """Return the style properties of an element as a dict. The dict is shared and must never be modified."""
+        tag = element.tag.rpartition('}')[2] if isinstance(element.tag, str) else ""
+
+        # Most elements have a unique id, only take it into account if a rule selects it
+        element_id = element.get("id")
+        element_id = element_id if element_id in self._rules['id'] else None
+
+        key = (tag, element.get("class"), element_id, element.get("style")) + \
+            tuple(element.get(attribute) for attribute in self.presentation_attributes)
+
+        style = self._styles.get(key)
+        if style is None:
+            style = self._styles[key] = self._compute_style(*key)
+
+        return style
+
+    def _compute_style(self, tag, classes, element_id, style_attribute, *presentation_values) -> dict:
+        style = {attribute: value for attribute, value in zip(self.presentation_attributes, presentation_values)
+                 if value is not None}
+
+        style.update(self._rules['tag'].get('*', {}))
+        style.update(self._rules['tag'].get(tag, {}))
+
+        for class_name in (classes or "").split():
+            style.update(self._rules['class'].get(class_name, {}))
+
+        if element_id:
+            style.update(self._rules['id'].get(element_id, {}))
+
+        if style_attribute:
+            style.update(_parse_declarations(style_attribute))
+
+        return style
@@ -1,42 +1,56 @@
 import math
-from copy import deepcopy
+from array import array
 
-from svg_to_gcode.geometry import Vector, Matrix, IdentityMatrix
+from svg_to_gcode.geometry import Vector, Matrix
 
 
 class Transformation:
     """
     The Transformation class handles the parsing and computation behind svg transform attributes.
+
+    The affine transformation is stored as the six coefficients of an svg matrix(a, b, c, d, e, f), which maps a point
+    (x, y) to (a*x + c*y + e, b*x + d*y + f).
     """
-    __slots__ = "translation_matrix", "transformation_record", "command_methods"
+    __slots__ = "a", "b", "c", "d", "e", "f", "transformation_record"
+
+    command_methods = {
+        "matrix": "add_matrix",
+        "translate": "add_translation",
+        "scale": "add_scale",
+        "rotate": "add_rotation",
+        "skewX": "add_skew_x",
+        "skewY": "add_skew_y"
+    }
 
     def __init__(self):
-        # Fancy matrix used for affine transformations (translations and linear transformations)
-        self.translation_matrix = IdentityMatrix(4)
+        # Identity
+        self.a, self.b, self.c, self.d, self.e, self.f = 1.0, 0.0, 0.0, 1.0, 0.0, 0.0
 
         self.transformation_record = []
 
-        self.command_methods = {
-                "matrix": self.add_matrix,
-                "translate": self.add_translation,
-                "scale": self.add_scale,
-                "rotate": self.add_rotation,
-                "skewX": self.add_skew_x,
-                "skewY": self.add_skew_y
-            }
-
     def __repr__(self):
         transformations = ", ".join(
-            [f"{transformation[0]}("f"{', '.join(map(lambda x: str(x), self.transformation_record[0][1]))})"
+            [f"{transformation[0]}("f"{', '.join(map(lambda x: str(x), transformation[1]))})"
                                     for transformation in self.transformation_record])
         return f"Transformation({transformations})"
 
     def __deepcopy__(self, memodict={}):
         copy = Transformation()
-        copy.translation_matrix = deepcopy(self.translation_matrix)
+        copy.a, copy.b, copy.c, copy.d, copy.e, copy.f = self.a, self.b, self.c, self.d, self.e, self.f
+        copy.transformation_record = [(command, list(arguments)) for command, arguments in self.transformation_record]
 
         return copy
 
+    @property
+    def translation_matrix(self) -> Matrix:
+        """The transformation as a 4x4 matrix. Only kept for compatibility, the coefficients are used internally."""
+        return Matrix([
+            [self.a, self.c, 0, self.e],
+            [self.b, self.d, 0, self.f],
+            [0,      0,      1, 0],
+            [0,      0,      0, 1]
+        ])
+
     def add_transform(self, transform_string: str):
         transformations = transform_string.split(')')
 
@@ -50,106 +64,97 @@ class Transformation:
             command = command.strip()
             arguments = [float(argument.strip()) for argument in arguments.replace(',', ' ').split()]
 
-            command_method = self.command_methods[command]
+            command_method = getattr(self, self.command_methods[command])
 
             command_method(*arguments)
 
+    def _multiply(self, a, b, c, d, e, f):
+        """Right-multiply the transformation by another affine transformation, ie. apply the other one first."""
+        self.a, self.b, self.c, self.d, self.e, self.f = (
+            self.a * a + self.c * b,
+            self.b * a + self.d * b,
+            self.a * c + self.c * d,
+            self.b * c + self.d * d,
+            self.a * e + self.c * f + self.e,
+            self.b * e + self.d * f + self.f
+        )
+
     # SVG transforms are equivalent to CSS transforms https://www.w3.org/TR/css-transforms-1/#MatrixDefined
     def add_matrix(self, a, b, c, d, e, f):
         self.transformation_record.append(("matrix", [a, b, c, d, e, f]))
-        matrix = Matrix([
-            [a, c, 0, e],
-            [b, d, 0, f],
-            [0, 0, 1, 0],
-            [0, 0, 0, 1]
-        ])
-
-        self.translation_matrix *= matrix
+        self._multiply(a, b, c, d, e, f)
 
     def add_translation(self, x: float, y=0.0):
         self.transformation_record.append(("translate", [x, y]))
-        translation_matrix = Matrix([
-            [1, 0, 0, x],
-            [0, 1, 0, y],
-            [0, 0, 1, 0],
-            [0, 0, 0, 1]
-        ])
-
-        self.translation_matrix *= translation_matrix
+        self._multiply(1, 0, 0, 1, x, y)
 
     def add_scale(self, factor: float, factor_y=None):
         factor_x = factor
         factor_y = factor if factor_y is None else factor_y
 
         self.transformation_record.append(("scale", [factor_x, factor_y]))
-
-        scale_matrix = Matrix([
-            [factor_x, 0,        0, 0],
-            [0,        factor_y, 0, 0],
-            [0,        0,        1, 0],
-            [0,        0,        0, 1]
-        ])
-
-        self.translation_matrix *= scale_matrix
+        self._multiply(factor_x, 0, 0, factor_y, 0, 0)
 
     def add_rotation(self, angle: float):
         self.transformation_record.append(("rotate", [angle]))
 
         angle = math.radians(angle)
-        rotation_matrix = Matrix([
-            [math.cos(angle), -math.sin(angle), 0, 0],
-            [math.sin(angle), math.cos(angle),  0, 0],
-            [0,               0,                1, 0],
-            [0,               0,                0, 1]
-        ])
-
-        self.translation_matrix *= rotation_matrix
+        self._multiply(math.cos(angle), math.sin(angle), -math.sin(angle), math.cos(angle), 0, 0)
 
     def add_skew_x(self, angle):
         self.transformation_record.append(("skewX", [angle]))
 
         angle = math.radians(angle)
-        skew_matrix = IdentityMatrix(4)
-        skew_matrix.matrix_list[0][1] = math.tan(angle)
-
-        self.translation_matrix *= skew_matrix
+        self._multiply(1, 0, math.tan(angle), 1, 0, 0)
 
     def add_skew_y(self, angle):
         self.transformation_record.append(("skewY", [angle]))
 
         angle = math.radians(angle)
-        skew_matrix = IdentityMatrix(4)
-        skew_matrix.matrix_list[1][0] = math.tan(angle)
-
-        self.translation_matrix *= skew_matrix
+        self._multiply(1, math.tan(angle), 0, 1, 0, 0)
 
     def extend(self, other: "Transformation"):
-        self.translation_matrix *= other.translation_matrix
+        self._multiply(other.a, other.b, other.c, other.d, other.e, other.f)
         self.transformation_record.extend(other.transformation_record)
 
+    def combined(self, other: "Transformation") -> "Transformation":
+        """
+        Return a new transformation equivalent to self.extend(other), leaving both operands untouched. Used to share
+        transformations between svg elements without copying them for every element.
+        """
+        combination = Transformation()
+        combination.a, combination.b, combination.c = self.a, self.b, self.c
+        combination.d, combination.e, combination.f = self.d, self.e, self.f
+        combination.transformation_record = self.transformation_record[:]
+
+        combination.extend(other)
+
+        return combination
+
     def apply_affine_transformation(self, vector: Vector) -> Vector:
         """
         Apply the full affine transformation (linear + translation) to a vector. Generally used to transform points.
         Eg the center of an ellipse.
         """
-        vector_4d = Matrix([[vector.x], [vector.y], [1], [1]])
-        vector_4d = self.translation_matrix * vector_4d
-
-        return Vector(vector_4d.matrix_list[0][0], vector_4d.matrix_list[1][0])
+        x, y = vector.x, vector.y
+        return Vector(self.a * x + self.c * y + self.e, self.b * x + self.d * y + self.f)
 
     def apply_linear_transformation(self, vector: Vector) -> Vector:
         """
         Apply the linear component of the affine transformation (no translation) to a vector.
         Generally used to transform vector properties. Eg the radii of an ellipse.
         """
-        a = self.translation_matrix[0][0]
-        b = self.translation_matrix[1][0]
-        c = self.translation_matrix[0][1]
-        d = self.translation_matrix[1][1]
-
-        linear_transformation = Matrix([
-            [a, c],
-            [b, d]
-        ])
+        x, y = vector.x, vector.y
+        return Vector(self.a * x + self.c * y, self.b * x + self.d * y)
+
+    def apply_affine_transformation_array(self, coordinates) -> array:
+        """
+        Apply the full affine transformation to many points at once.
+
+        :param coordinates: a coordinate array (or any sequence) of the form [x0, y0, x1, y1, ...]
+        :return: a new coordinate array of doubles containing the transformed points.
+        """
+        a, b, c, d, e, f = self.a, self.b, self.c, self.d, self.e, self.f
 
-        return linear_transformation * vector
+        return array('d', [coordinate for x, y in zip(coordinates[0::2], coordinates[1::2])
+                           for coordinate in (a * x + c * y + e, b * x + d * y + f)])